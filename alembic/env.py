@@ -16,7 +16,7 @@ fileConfig(config.config_file_name)
 # add your model's MetaData object here
 # for 'autogenerate' support
 from app.core.database import Base
-from app.models import user, product, cart, order
+from app.models import user, product, cart, order, stripe_event, outbox
 target_metadata = Base.metadata
 
 # other values from the config, defined by the needs of env.py,
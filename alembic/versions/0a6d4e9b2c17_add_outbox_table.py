@@ -0,0 +1,39 @@
+"""add outbox table for transactional side effects
+
+Revision ID: 0a6d4e9b2c17
+Revises: f7c2a9d3e6b1
+Create Date: 2026-10-15 13:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '0a6d4e9b2c17'
+down_revision = 'f7c2a9d3e6b1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "outbox",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("kind", sa.String(), nullable=False),
+        sa.Column(
+            "payload",
+            sa.JSON().with_variant(postgresql.JSONB(), "postgresql"),
+            nullable=False,
+        ),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("last_error", sa.Text(), nullable=True),
+    )
+    op.create_index("ix_outbox_id", "outbox", ["id"])
+
+
+def downgrade():
+    op.drop_index("ix_outbox_id", table_name="outbox")
+    op.drop_table("outbox")
@@ -0,0 +1,25 @@
+"""add order_items.order_id index
+
+Revision ID: 2b8f4c6e1d93
+Revises: 0a6d4e9b2c17
+Create Date: 2026-10-15 14:05:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '2b8f4c6e1d93'
+down_revision = '0a6d4e9b2c17'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # cart_items.cart_id and wishlist_items.user_id already lead the
+    # composite indexes on those tables, so only order items need one
+    op.create_index("ix_order_items_order_id", "order_items", ["order_id"])
+
+
+def downgrade():
+    op.drop_index("ix_order_items_order_id", table_name="order_items")
@@ -0,0 +1,50 @@
+"""add composite indexes for orders and carts
+
+Revision ID: 4f1a9c2d7b3e
+Revises: cde7e51436bf
+Create Date: 2026-10-15 10:05:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4f1a9c2d7b3e'
+down_revision = 'cde7e51436bf'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        "ix_orders_user_created",
+        "orders",
+        ["user_id", sa.text("created_at DESC")],
+    )
+    op.create_index(
+        "ix_orders_status_created",
+        "orders",
+        ["status", "created_at"],
+    )
+    # Unique indexes fail if duplicate carts/cart lines already exist;
+    # merge those before upgrading.
+    op.create_index(
+        "ix_carts_user",
+        "carts",
+        ["user_id"],
+        unique=True,
+    )
+    op.create_index(
+        "ix_cartitems_cart_product",
+        "cart_items",
+        ["cart_id", "product_id"],
+        unique=True,
+    )
+
+
+def downgrade():
+    op.drop_index("ix_cartitems_cart_product", table_name="cart_items")
+    op.drop_index("ix_carts_user", table_name="carts")
+    op.drop_index("ix_orders_status_created", table_name="orders")
+    op.drop_index("ix_orders_user_created", table_name="orders")
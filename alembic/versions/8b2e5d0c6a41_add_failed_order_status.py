@@ -0,0 +1,28 @@
+"""add FAILED order status
+
+Revision ID: 8b2e5d0c6a41
+Revises: 4f1a9c2d7b3e
+Create Date: 2026-10-15 11:20:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '8b2e5d0c6a41'
+down_revision = '4f1a9c2d7b3e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # SQLAlchemy stores enum member names; only PostgreSQL has a native type
+    if op.get_bind().dialect.name == "postgresql":
+        # ADD VALUE cannot run inside a transaction block on older PostgreSQL
+        with op.get_context().autocommit_block():
+            op.execute("ALTER TYPE orderstatus ADD VALUE IF NOT EXISTS 'FAILED'")
+
+
+def downgrade():
+    # PostgreSQL cannot drop a value from an enum type; move rows back instead
+    op.execute("UPDATE orders SET status = 'CANCELLED' WHERE status = 'FAILED'")
@@ -0,0 +1,32 @@
+"""add version_id columns for optimistic locking
+
+Revision ID: c3d9e7f21a58
+Revises: 8b2e5d0c6a41
+Create Date: 2026-10-15 11:45:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3d9e7f21a58'
+down_revision = '8b2e5d0c6a41'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        "orders",
+        sa.Column("version_id", sa.Integer(), nullable=False, server_default="1"),
+    )
+    op.add_column(
+        "products",
+        sa.Column("version_id", sa.Integer(), nullable=False, server_default="1"),
+    )
+
+
+def downgrade():
+    op.drop_column("products", "version_id")
+    op.drop_column("orders", "version_id")
@@ -0,0 +1,28 @@
+"""add lower(username) index
+
+Revision ID: cde7e51436bf
+Revises: 
+Create Date: 2026-10-15 09:12:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'cde7e51436bf'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        "ix_users_username_lower",
+        "users",
+        [sa.text("lower(username)")],
+    )
+
+
+def downgrade():
+    op.drop_index("ix_users_username_lower", table_name="users")
@@ -0,0 +1,28 @@
+"""add stripe_events table for webhook idempotency
+
+Revision ID: e5a1b8c4d902
+Revises: c3d9e7f21a58
+Create Date: 2026-10-15 12:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5a1b8c4d902'
+down_revision = 'c3d9e7f21a58'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "stripe_events",
+        sa.Column("event_id", sa.String(), primary_key=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+
+
+def downgrade():
+    op.drop_table("stripe_events")
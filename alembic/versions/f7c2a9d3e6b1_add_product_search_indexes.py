@@ -0,0 +1,54 @@
+"""add product filter and trigram search indexes
+
+Revision ID: f7c2a9d3e6b1
+Revises: e5a1b8c4d902
+Create Date: 2026-10-15 13:05:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f7c2a9d3e6b1'
+down_revision = 'e5a1b8c4d902'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    is_postgres = op.get_bind().dialect.name == "postgresql"
+
+    # Partial index for the active-catalogue category/price filters
+    op.create_index(
+        "ix_products_active_category_price",
+        "products",
+        ["category", "price"],
+        postgresql_where=sa.text("is_active"),
+        sqlite_where=sa.text("is_active"),
+    )
+
+    if is_postgres:
+        # Trigram GIN indexes let ILIKE '%term%' use an index
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        op.create_index(
+            "ix_products_name_trgm",
+            "products",
+            ["name"],
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+        )
+        op.create_index(
+            "ix_products_description_trgm",
+            "products",
+            ["description"],
+            postgresql_using="gin",
+            postgresql_ops={"description": "gin_trgm_ops"},
+        )
+
+
+def downgrade():
+    if op.get_bind().dialect.name == "postgresql":
+        op.drop_index("ix_products_description_trgm", table_name="products")
+        op.drop_index("ix_products_name_trgm", table_name="products")
+    op.drop_index("ix_products_active_category_price", table_name="products")
@@ -1,40 +1,95 @@
-from typing import Generator, Optional, Tuple
-from fastapi import Depends, HTTPException, status, Request
-from fastapi.security import OAuth2PasswordBearer
-from jose import jwt, JWTError
+from typing import Generator, NamedTuple, Optional, Tuple
+from fastapi import Depends, HTTPException, Query, status, Request
+from fastapi.concurrency import run_in_threadpool
+import jwt
 from pydantic import ValidationError
 from sqlalchemy.orm import Session
 import time
+import hashlib
 import logging
-from datetime import datetime
+import threading
+
+from cachetools import TTLCache
 
 from app.core.config import settings
 from app.core.database import get_db
 from app.models.user import User
 from app.schemas.token import TokenPayload
 
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 logger = logging.getLogger(__name__)
 
+# Built once at import; exp is verified by PyJWT itself
+_DECODE_KWARGS = {
+    "key": settings.SECRET_KEY,
+    # Explicitly specify algorithms to prevent algorithm confusion attacks
+    "algorithms": [settings.ALGORITHM],
+    "options": {"require": ["exp", "sub", "type"]},
+}
+
+# Successfully decoded tokens, keyed by the SHA-256 digest of the raw token.
+# Cache hits re-check exp since the entry can outlive the token.
+_token_cache: TTLCache = TTLCache(maxsize=10000, ttl=30)
+
+
+class CurrentUser(NamedTuple):
+    """Authenticated user fields needed for authorization checks"""
+    id: int
+    email: str
+    is_active: bool
+    is_admin: bool
+
+
+# CurrentUser entries keyed by user ID
+_user_cache: TTLCache = TTLCache(maxsize=5000, ttl=30)
+
+_cache_lock = threading.Lock()
+
 # Consider implementing token blacklisting with Redis if needed
 # from app.core.redis import redis_client
 # def is_token_blacklisted(jti: str) -> bool:
 #     """Check if a token has been blacklisted"""
 #     return redis_client.exists(f"blacklist:{jti}")
 
+def invalidate_user_cache(user_id: int) -> None:
+    """Drop a user's cached auth data so the next request reloads it"""
+    with _cache_lock:
+        _user_cache.pop(user_id, None)
+
+def _bearer_token(request: Request) -> str:
+    """Extract the token from an `Authorization: Bearer <token>` header"""
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return token
+
 def decode_token(token: str) -> TokenPayload:
     """
     Decode and validate JWT token
 
-    Returns the validated token payload
+    Returns the validated token payload. Results are cached for a short
+    time so repeated requests with the same token skip the signature check.
     """
+    cache_key = hashlib.sha256(token.encode()).digest()
+    with _cache_lock:
+        token_data = _token_cache.get(cache_key)
+    if token_data is not None:
+        if token_data.exp < time.time():
+            with _cache_lock:
+                _token_cache.pop(cache_key, None)
+            logger.warning(f"Expired token used (sub: {token_data.sub})")
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Token expired",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        return token_data
+
     try:
-        # Explicitly specify algorithms to prevent algorithm confusion attacks
-        payload = jwt.decode(
-            token,
-            settings.SECRET_KEY,
-            algorithms=[settings.ALGORITHM]
-        )
+        payload = jwt.decode(token, **_DECODE_KWARGS)
         token_data = TokenPayload(**payload)
 
         # Check if token is the right type (access vs refresh)
@@ -45,9 +100,18 @@ def decode_token(token: str) -> TokenPayload:
                 headers={"WWW-Authenticate": "Bearer"},
             )
 
+        with _cache_lock:
+            _token_cache[cache_key] = token_data
         return token_data
 
-    except JWTError as e:
+    except jwt.ExpiredSignatureError:
+        logger.warning("Expired token used")
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token expired",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    except jwt.PyJWTError as e:
         logger.warning(f"JWT decode error: {str(e)}")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -63,25 +127,18 @@ def decode_token(token: str) -> TokenPayload:
         )
 
 
-def get_current_user(
-    db: Session = Depends(get_db),
-    token: str = Depends(oauth2_scheme)
-) -> User:
+async def get_current_user(
+    request: Request,
+    db: Session = Depends(get_db)
+) -> CurrentUser:
     """
     Get the current authenticated user.
 
-    Validates JWT token and returns the corresponding user.
+    Validates JWT token and returns the corresponding user. The bearer
+    token is read straight from the header rather than through an
+    OAuth2PasswordBearer dependency.
     """
-    token_data = decode_token(token)
-
-    # Check token expiration explicitly (using utcnow() is safer than time.time())
-    if token_data.exp < datetime.utcnow().timestamp():
-        logger.warning(f"Expired token used (sub: {token_data.sub})")
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Token expired",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+    token_data = decode_token(_bearer_token(request))
 
     # If using token blacklisting, check if token is blacklisted
     # jti = raw_payload.get("jti") # Would need raw_payload back if enabling this
@@ -93,29 +150,44 @@ def get_current_user(
     #         headers={"WWW-Authenticate": "Bearer"},
     #     )
 
-    # Get user from database
-    user = db.query(User).filter(User.id == token_data.sub).first()
-    if not user:
-        logger.warning(f"Auth attempt with valid token but non-existent user ID: {token_data.sub}")
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
+    # Get user from the short-lived cache, falling back to the database
+    with _cache_lock:
+        cached_user = _user_cache.get(token_data.sub)
+
+    if cached_user is None:
+        # Only the DB lookup goes through the threadpool; decode and cache
+        # hits stay on the event loop. Project just the columns we need
+        # instead of hydrating a full User entity.
+        row = await run_in_threadpool(
+            db.query(User.id, User.email, User.is_active, User.is_admin)
+            .filter(User.id == token_data.sub)
+            .first
         )
+        if not row:
+            logger.warning(f"Auth attempt with valid token but non-existent user ID: {token_data.sub}")
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="User not found"
+            )
+        cached_user = CurrentUser(*row)
+        with _cache_lock:
+            _user_cache[cached_user.id] = cached_user
 
     # Check if user is active
-    if not user.is_active:
-        logger.warning(f"Auth attempt by inactive user: {user.email} (ID: {user.id})")
+    if not cached_user.is_active:
+        logger.warning(f"Auth attempt by inactive user: {cached_user.email} (ID: {cached_user.id})")
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Inactive user"
         )
 
-    return user
+    # Endpoints that need the full row must load it themselves
+    return cached_user
 
 
-def get_current_active_admin(
-    current_user: User = Depends(get_current_user)
-) -> User:
+async def get_current_active_admin(
+    current_user: CurrentUser = Depends(get_current_user)
+) -> CurrentUser:
     """
     Get current user and verify they are an admin.
     """
@@ -128,13 +200,10 @@ def get_current_active_admin(
     return current_user
 
 
-# Add this utility function for query protection against DoS
-def limit_query_factory(max_limit: int = 100, default_limit: int = 20):
-    """
-    Factory function to create a dependency that limits query parameters
-    to prevent DoS attacks through large queries
-    """
-    def limit_query(skip: int = 0, limit: int = default_limit):
-        """Limits query parameters to reasonable ranges"""
-        return max(0, skip), min(max_limit, limit)
-    return limit_query
+# Shared pagination dependency; bounds protect against DoS through large queries
+def paginate(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+) -> Tuple[int, int]:
+    """Validated (skip, limit) pagination parameters"""
+    return skip, limit
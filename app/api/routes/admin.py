@@ -1,28 +1,30 @@
 from typing import Any, List
 
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.orm import Session, selectinload
 
-from app.api.deps import get_current_active_admin
+from app.api.deps import CurrentUser, get_current_active_admin, invalidate_user_cache
 from app.core.database import get_db
-from app.models.user import User
 from app.models.order import Order, OrderStatus
+from app.models.user import User
 from app.schemas.order import Order as OrderSchema, OrderUpdate
+from app.schemas.user import User as UserSchema, UserStatusUpdate
 
 router = APIRouter()
 
-@router.get("/orders", response_model=List[OrderSchema])
+@router.get("/orders", response_model=List[OrderSchema], response_class=ORJSONResponse)
 def get_all_orders(
     db: Session = Depends(get_db),
     skip: int = 0,
     limit: int = 100,
     status: OrderStatus = None,
-    current_user: User = Depends(get_current_active_admin),
+    current_user: CurrentUser = Depends(get_current_active_admin),
 ) -> Any:
     """
     Get all orders with optional status filter (admin only)
     """
-    query = db.query(Order)
+    query = db.query(Order).options(selectinload(Order.items))
     if status:
         query = query.filter(Order.status == status)
     
@@ -35,7 +37,7 @@ def update_order_status(
     db: Session = Depends(get_db),
     order_id: int,
     order_in: OrderUpdate,
-    current_user: User = Depends(get_current_active_admin),
+    current_user: CurrentUser = Depends(get_current_active_admin),
 ) -> Any:
     """
     Update order status (admin only)
@@ -44,7 +46,7 @@ def update_order_status(
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
     
-    update_data = order_in.dict(exclude_unset=True)
+    update_data = order_in.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         setattr(order, field, value)
     
@@ -52,3 +54,30 @@ def update_order_status(
     db.commit()
     db.refresh(order)
     return order
+
+@router.put("/users/{user_id}", response_model=UserSchema)
+def update_user_status(
+    *,
+    db: Session = Depends(get_db),
+    user_id: int,
+    user_in: UserStatusUpdate,
+    current_user: CurrentUser = Depends(get_current_active_admin),
+) -> Any:
+    """
+    Activate or deactivate a user, or change their admin role (admin only)
+    """
+    user = db.query(User).filter(User.id == user_id).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    update_data = user_in.model_dump(exclude_unset=True)
+    for field, value in update_data.items():
+        setattr(user, field, value)
+
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+
+    # Otherwise the cached CurrentUser keeps the old flags until it expires
+    invalidate_user_cache(user.id)
+    return user
@@ -2,23 +2,32 @@ from typing import Any, Dict, List, Optional
 from datetime import datetime, timedelta
 
 from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, desc, select
 
-from app.api.deps import get_db, get_current_active_admin
-from app.models.user import User
+from app.api.deps import CurrentUser, get_current_active_admin
+from app.core.cache import cache_response
+from app.core.database import get_async_db
 from app.models.order import Order, OrderItem, OrderStatus
 from app.models.product import Product
 
 router = APIRouter()
 
-@router.get("/sales", response_model=Dict[str, Any])
+# Query period -> PostgreSQL date_trunc field
+_DATE_TRUNC_FIELDS = {"daily": "day", "weekly": "week", "monthly": "month"}
+
+# Paid orders, before and after the worker has reserved their stock
+_COMPLETED_STATUSES = (OrderStatus.PAID, OrderStatus.PROCESSING)
+
+@router.get("/sales", response_model=Dict[str, Any], response_class=ORJSONResponse)
+@cache_response(prefix="analytics", expire_seconds=60)  # Admin dashboards tolerate a minute of staleness
 async def get_sales_analytics(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     start_date: Optional[datetime] = Query(None),
     end_date: Optional[datetime] = Query(None),
     period: str = Query("daily", regex="^(daily|weekly|monthly)$"),
-    current_user: User = Depends(get_current_active_admin),
+    current_user: CurrentUser = Depends(get_current_active_admin),
 ) -> Any:
     """
     Get sales analytics (admin only)
@@ -29,32 +38,39 @@ async def get_sales_analytics(
     if not start_date:
         start_date = end_date - timedelta(days=30)
     
+    # Completed orders in the requested range
+    filters = (
+        Order.created_at.between(start_date, end_date),
+        Order.status.in_(_COMPLETED_STATUSES),
+    )
+
     # Query for completed orders
-    query = db.query(
-        func.date_trunc(period, Order.created_at).label('period'),
+    bucket = func.date_trunc(_DATE_TRUNC_FIELDS[period], Order.created_at)
+    query = select(
+        bucket.label('period'),
         func.count(Order.id).label('order_count'),
         func.sum(Order.total_amount).label('revenue')
-    ).filter(
-        Order.created_at.between(start_date, end_date),
-        Order.status == OrderStatus.PAID
+    ).where(
+        *filters
     ).group_by(
-        func.date_trunc(period, Order.created_at)
+        bucket
     ).order_by(
-        func.date_trunc(period, Order.created_at)
+        bucket
     )
     
-    sales_data = query.all()
+    sales_data = (await db.execute(query)).all()
     
-    # Format results
+    # Format results. orjson serializes datetimes natively but not Decimal,
+    # which SUM returns if the amount columns ever become Numeric
     result = {
         "timeframe": {
-            "start_date": start_date.isoformat(),
-            "end_date": end_date.isoformat(),
+            "start_date": start_date,
+            "end_date": end_date,
             "period": period,
         },
         "data": [
             {
-                "date": row.period.isoformat(),
+                "date": row.period,
                 "order_count": row.order_count,
                 "revenue": float(row.revenue) if row.revenue else 0
             }
@@ -62,9 +78,15 @@ async def get_sales_analytics(
         ]
     }
     
-    # Add summary statistics
-    total_orders = sum(item["order_count"] for item in result["data"])
-    total_revenue = sum(item["revenue"] for item in result["data"])
+    # Add summary statistics, aggregated in the database
+    summary = (await db.execute(
+        select(
+            func.count(Order.id).label('total_orders'),
+            func.coalesce(func.sum(Order.total_amount), 0).label('total_revenue')
+        ).where(*filters)
+    )).one()
+    total_orders = summary.total_orders
+    total_revenue = float(summary.total_revenue)
     
     result["summary"] = {
         "total_orders": total_orders,
@@ -74,12 +96,13 @@ async def get_sales_analytics(
     
     return result
 
-@router.get("/top-products", response_model=List[Dict[str, Any]])
+@router.get("/top-products", response_model=List[Dict[str, Any]], response_class=ORJSONResponse)
+@cache_response(prefix="analytics", expire_seconds=60)
 async def get_top_products(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     limit: int = Query(10, ge=1, le=50),
     days: int = Query(30, ge=1, le=365),
-    current_user: User = Depends(get_current_active_admin),
+    current_user: CurrentUser = Depends(get_current_active_admin),
 ) -> Any:
     """
     Get top selling products (admin only)
@@ -87,7 +110,7 @@ async def get_top_products(
     start_date = datetime.now() - timedelta(days=days)
     
     # Query for top products
-    query = db.query(
+    query = select(
         OrderItem.product_name,
         func.sum(OrderItem.quantity).label('units_sold'),
         func.sum(OrderItem.quantity * OrderItem.unit_price).label('revenue'),
@@ -97,9 +120,9 @@ async def get_top_products(
         Order, OrderItem.order_id == Order.id
     ).outerjoin(  # Outer join because the product might have been deleted
         Product, OrderItem.product_id == Product.id
-    ).filter(
+    ).where(
         Order.created_at >= start_date,
-        Order.status == OrderStatus.PAID
+        Order.status.in_(_COMPLETED_STATUSES)
     ).group_by(
         OrderItem.product_name,
         Product.id,
@@ -108,7 +131,7 @@ async def get_top_products(
         desc('revenue')
     ).limit(limit)
     
-    products = query.all()
+    products = (await db.execute(query)).all()
     
     # Format results
     result = [
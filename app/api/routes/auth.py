@@ -1,14 +1,20 @@
 from datetime import timedelta
-from typing import Any
+from typing import Any, Optional
+import hashlib
 import logging
 import secrets
+import threading
 
 from fastapi import APIRouter, Depends, HTTPException, status, Request
 from fastapi.security import OAuth2PasswordRequestForm
+from cachetools import TTLCache
 from sqlalchemy.orm import Session
+from sqlalchemy import func, or_
 
 from app.core.config import settings
-from app.core.security import create_access_token, verify_password, get_password_hash
+from app.core.security import (
+    create_access_token, averify_password, aget_password_hash
+)
 from app.core.database import get_db
 from app.models.user import User
 from app.schemas.token import Token
@@ -18,6 +24,24 @@ from app.core.limiter import limiter
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+# Recently seen unknown login emails, keyed by SHA-256 digest. Repeat attempts
+# for the same email skip the DB lookup; they still pay for bcrypt below.
+_unknown_login_cache: TTLCache = TTLCache(maxsize=10000, ttl=10)
+_unknown_login_lock = threading.Lock()
+
+_ACCESS_TOKEN_EXPIRES = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+
+# Verified against when the user doesn't exist so both paths pay for bcrypt.
+# Hashed on first use rather than at import, which every process (tests and
+# the worker included) would otherwise pay for
+_dummy_password_hash: Optional[str] = None
+
+async def _get_dummy_password_hash() -> str:
+    global _dummy_password_hash
+    if _dummy_password_hash is None:
+        _dummy_password_hash = await aget_password_hash(secrets.token_urlsafe(16))
+    return _dummy_password_hash
+
 # Function to create JTI (JWT ID) for token tracking
 def generate_jti() -> str:
     """Generate a unique JWT ID"""
@@ -36,12 +60,26 @@ async def login_access_token(
     # Normalize email to lowercase to prevent case-sensitivity bypass
     email = form_data.username.lower() if '@' in form_data.username else form_data.username
     
-    # Get user by email
-    user = db.query(User).filter(User.email == email).first()
+    email_key = hashlib.sha256(email.encode()).digest()
+    with _unknown_login_lock:
+        known_unknown = email_key in _unknown_login_cache
+
+    user = None
+    if not known_unknown:
+        # Get user by email
+        user = db.query(User).filter(User.email == email).first()
+        if not user:
+            with _unknown_login_lock:
+                _unknown_login_cache[email_key] = True
+
+    if not user:
+        # Keep timing in line with a wrong password for an existing user, on
+        # cached misses too, or a repeat probe would reveal the email is unknown
+        await averify_password(form_data.password, await _get_dummy_password_hash())
     
     # If no user found or wrong password - don't distinguish between these cases
     # to prevent user enumeration
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    if not user or not await averify_password(form_data.password, user.hashed_password):
         # Audit log: Failed login attempt
         logger.warning(
             f"Failed login attempt for: {email} from IP: {request.client.host}",
@@ -78,10 +116,9 @@ async def login_access_token(
     }
 
     # Create access token
-    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
         user.id, 
-        expires_delta=access_token_expires,
+        expires_delta=_ACCESS_TOKEN_EXPIRES,
         additional_claims=additional_claims
     )
 
@@ -112,9 +149,17 @@ async def register_user(
     """
     Create new user
     """
-    # Check for existing user by email (case-insensitive)
-    user = db.query(User).filter(User.email.ilike(user_in.email)).first()
-    if user:
+    email_lower = user_in.email.lower()
+    username_lower = user_in.username.lower()
+
+    # Check for an existing email or username (case-insensitive) in one query
+    existing = db.query(User.email, User.username).filter(
+        or_(
+            User.email == email_lower,
+            func.lower(User.username) == username_lower
+        )
+    ).first()
+    if existing and existing.email == email_lower:
         # Log registration attempt for existing email
         logger.warning(
             f"Registration attempt with existing email: {user_in.email} from IP: {request.client.host}",
@@ -124,10 +169,7 @@ async def register_user(
             status_code=400,
             detail="A user with this email already exists.",
         )
-        
-    # Check for existing username (case-insensitive)
-    user = db.query(User).filter(User.username.ilike(user_in.username)).first()
-    if user:
+    if existing:
         # Log registration attempt for existing username
         logger.warning(
             f"Registration attempt with existing username: {user_in.username} from IP: {request.client.host}",
@@ -138,11 +180,13 @@ async def register_user(
             detail="A user with this username already exists.",
         )
     
+    hashed_password = await aget_password_hash(user_in.password)
+
     # Create user with email normalized to lowercase
     user = User(
-        email=user_in.email.lower(),  # Normalize email
+        email=email_lower,  # Normalize email
         username=user_in.username,
-        hashed_password=get_password_hash(user_in.password),
+        hashed_password=hashed_password,
         full_name=user_in.full_name,
         is_active=True,
         is_admin=False,
@@ -150,6 +194,10 @@ async def register_user(
     db.add(user)
     db.commit()
     db.refresh(user)
+
+    # The email may have been cached as unknown by a recent failed login
+    with _unknown_login_lock:
+        _unknown_login_cache.pop(hashlib.sha256(email_lower.encode()).digest(), None)
     
     # Audit log: User registration
     logger.info(
@@ -1,38 +1,63 @@
 from typing import Any
 
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
 
-from app.api.deps import get_current_user
+from app.api.deps import CurrentUser, get_current_user
 from app.core.database import get_db
-from app.models.user import User
 from app.models.cart import Cart, CartItem
 from app.models.product import Product
 from app.schemas.cart import Cart as CartSchema, CartItemCreate, CartItemUpdate
 
 router = APIRouter()
 
-@router.get("/", response_model=CartSchema)
+def _compute_cart_total(db: Session, cart_id: int) -> float:
+    """Sum quantity * unit_price for a cart in the database"""
+    return db.query(
+        func.coalesce(func.sum(CartItem.quantity * CartItem.unit_price), 0)
+    ).filter(CartItem.cart_id == cart_id).scalar()
+
+def _get_or_create_cart(db: Session, user_id: int) -> Cart:
+    """The user's cart, created if missing; a concurrent first request may win the insert"""
+    cart = db.query(Cart).filter(Cart.user_id == user_id).first()
+    if cart:
+        return cart
+    try:
+        # Savepoint, so losing the race on ix_carts_user only undoes this insert
+        with db.begin_nested():
+            cart = Cart(user_id=user_id)
+            db.add(cart)
+    except IntegrityError:
+        cart = db.query(Cart).filter(Cart.user_id == user_id).one()
+    return cart
+
+def _load_cart(db: Session, user_id: int) -> Cart:
+    """Load a user's cart with its items and products in one round of queries"""
+    return db.query(Cart).options(
+        selectinload(Cart.items).selectinload(CartItem.product)
+    ).filter(Cart.user_id == user_id).first()
+
+@router.get("/", response_model=CartSchema, response_class=ORJSONResponse)
 def get_cart(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
 ) -> Any:
     """
     Get current user's cart
     """
-    cart = db.query(Cart).filter(Cart.user_id == current_user.id).first()
+    cart = _load_cart(db, current_user.id)
     
     # Create cart if it doesn't exist
     if not cart:
-        cart = Cart(user_id=current_user.id)
-        db.add(cart)
+        cart = _get_or_create_cart(db, current_user.id)
         db.commit()
         db.refresh(cart)
     
     # Calculate total
-    total = 0
-    for item in cart.items:
-        total += item.quantity * item.unit_price
+    total = _compute_cart_total(db, cart.id)
     
     # Add total to cart object (it's not in the model)
     setattr(cart, "total", total)
@@ -44,18 +69,13 @@ def add_cart_item(
     *,
     db: Session = Depends(get_db),
     item_in: CartItemCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
 ) -> Any:
     """
     Add item to cart
     """
-    # Get or create cart
-    cart = db.query(Cart).filter(Cart.user_id == current_user.id).first()
-    if not cart:
-        cart = Cart(user_id=current_user.id)
-        db.add(cart)
-        db.commit()
-        db.refresh(cart)
+    # Get or create cart; items are loaded once after the commit below
+    cart = _get_or_create_cart(db, current_user.id)
     
     # Check if product exists and is active
     product = db.query(Product).filter(
@@ -75,6 +95,25 @@ def add_cart_item(
         CartItem.product_id == item_in.product_id
     ).first()
     
+    if not cart_item:
+        # Create new cart item
+        try:
+            # Savepoint, so a concurrent add of the same product (which trips
+            # ix_cartitems_cart_product) only undoes this insert
+            with db.begin_nested():
+                db.add(CartItem(
+                    cart_id=cart.id,
+                    product_id=item_in.product_id,
+                    quantity=item_in.quantity,
+                    unit_price=product.price
+                ))
+        except IntegrityError:
+            # The other request's line exists now; add to it below
+            cart_item = db.query(CartItem).filter(
+                CartItem.cart_id == cart.id,
+                CartItem.product_id == item_in.product_id
+            ).one()
+    
     if cart_item:
         # Update quantity if item exists
         if cart_item.quantity + item_in.quantity > product.stock:
@@ -82,23 +121,12 @@ def add_cart_item(
         
         cart_item.quantity += item_in.quantity
         cart_item.unit_price = product.price  # Update price in case it changed
-    else:
-        # Create new cart item
-        cart_item = CartItem(
-            cart_id=cart.id,
-            product_id=item_in.product_id,
-            quantity=item_in.quantity,
-            unit_price=product.price
-        )
-        db.add(cart_item)
     
     db.commit()
-    db.refresh(cart)
-    
-    # Calculate total
-    total = 0
-    for item in cart.items:
-        total += item.quantity * item.unit_price
+
+    # Reload items for the response and recompute the total in SQL
+    cart = _load_cart(db, current_user.id)
+    total = _compute_cart_total(db, cart.id)
     
     # Add total to cart object
     setattr(cart, "total", total)
@@ -111,12 +139,12 @@ def update_cart_item(
     db: Session = Depends(get_db),
     item_id: int,
     item_in: CartItemUpdate,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
 ) -> Any:
     """
     Update cart item quantity
     """
-    # Get cart
+    # Get cart; items are loaded once after the commit below
     cart = db.query(Cart).filter(Cart.user_id == current_user.id).first()
     if not cart:
         raise HTTPException(status_code=404, detail="Cart not found")
@@ -140,12 +168,10 @@ def update_cart_item(
     # Update quantity
     cart_item.quantity = item_in.quantity
     db.commit()
-    db.refresh(cart)
-    
-    # Calculate total
-    total = 0
-    for item in cart.items:
-        total += item.quantity * item.unit_price
+
+    # Reload items for the response and recompute the total in SQL
+    cart = _load_cart(db, current_user.id)
+    total = _compute_cart_total(db, cart.id)
     
     # Add total to cart object
     setattr(cart, "total", total)
@@ -157,12 +183,12 @@ def remove_cart_item(
     *,
     db: Session = Depends(get_db),
     item_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
 ) -> Any:
     """
     Remove item from cart
     """
-    # Get cart
+    # Get cart; items are loaded once after the commit below
     cart = db.query(Cart).filter(Cart.user_id == current_user.id).first()
     if not cart:
         raise HTTPException(status_code=404, detail="Cart not found")
@@ -178,12 +204,10 @@ def remove_cart_item(
     # Remove item
     db.delete(cart_item)
     db.commit()
-    db.refresh(cart)
-    
-    # Calculate total
-    total = 0
-    for item in cart.items:
-        total += item.quantity * item.unit_price
+
+    # Reload items for the response and recompute the total in SQL
+    cart = _load_cart(db, current_user.id)
+    total = _compute_cart_total(db, cart.id)
     
     # Add total to cart object
     setattr(cart, "total", total)
@@ -1,19 +1,31 @@
+from datetime import datetime, timezone
 from typing import Any, List
 import logging  # Add logging import
 
 from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Request
-from sqlalchemy.orm import Session
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import delete, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy.orm.exc import StaleDataError
+import orjson
 import stripe
 
-from app.api.deps import get_current_user
+from app.api.deps import CurrentUser, get_current_user
+from app.core.redis import redis_client
 from app.core.config import settings
-from app.core.database import get_db, SessionLocal
-from app.models.user import User
+from app.core.limiter import limiter
+from app.core.database import get_async_db, get_db, SessionLocal
+from app.core.queue import enqueue_job, redis_settings
 from app.models.cart import Cart, CartItem
 from app.models.order import Order, OrderItem, OrderStatus
+from app.models.outbox import Outbox
 from app.models.product import Product
+from app.models.stripe_event import StripeEvent
 from app.schemas.order import Order as OrderSchema, OrderCreate
-from app.services.notifications import email_service
+from app.services.orders import process_order_after_payment
+from app.services.outbox import ORDER_CONFIRMATION, dispatch_order_confirmations
 
 # Configure Stripe - Only if API key is available
 stripe_available = bool(settings.STRIPE_API_KEY)
@@ -28,15 +40,21 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-@router.get("/", response_model=List[OrderSchema])
-def get_user_orders(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+@router.get("/", response_model=List[OrderSchema], response_class=ORJSONResponse)
+async def get_user_orders(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user),
 ) -> Any:
     """
     Get current user's orders
     """
-    orders = db.query(Order).filter(Order.user_id == current_user.id).order_by(Order.created_at.desc()).all()
+    result = await db.execute(
+        select(Order)
+        .options(selectinload(Order.items))
+        .where(Order.user_id == current_user.id)
+        .order_by(Order.created_at.desc())
+    )
+    orders = result.scalars().all()
     return orders
 
 @router.get("/{order_id}", response_model=OrderSchema)
@@ -44,12 +62,12 @@ def get_order(
     *,
     db: Session = Depends(get_db),
     order_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
 ) -> Any:
     """
     Get specific order by ID
     """
-    order = db.query(Order).filter(
+    order = db.query(Order).options(selectinload(Order.items)).filter(
         Order.id == order_id,
         Order.user_id == current_user.id
     ).first()
@@ -57,38 +75,47 @@ def get_order(
         raise HTTPException(status_code=404, detail="Order not found")
     return order
 
-# Fix the process_order_after_payment function to use parameterized SQL for atomic operations
-def process_order_after_payment(db: Session, order_id: int):
-    """Background task to update product stock after successful payment"""
-    order = db.query(Order).filter(Order.id == order_id).first()
-    if not order or order.status != OrderStatus.PAID:
-        # Log if order not found or status incorrect for processing
-        logger.warning(f"Order {order_id} not found or not in PAID status for stock update.")
+async def _queue_stock_update(background_tasks: BackgroundTasks, order_id: int) -> None:
+    """Hand the stock update for a paid order to the arq worker"""
+    if not await enqueue_job("process_paid_order", order_id):
+        # No queue available (e.g. local dev without Redis): run in-process
+        # after the response; the task opens its own session either way
+        background_tasks.add_task(process_order_after_payment, order_id)
+
+def _queue_outbox_dispatch(background_tasks: BackgroundTasks) -> None:
+    """Send outbox emails in-process when there is no arq worker to poll them"""
+    if redis_settings is None:
+        # Without REDIS_URL the worker's cron never runs, so drain the outbox
+        # after the response instead of letting rows pile up
+        background_tasks.add_task(dispatch_order_confirmations)
+
+def create_payment_intent(order_id: int, total_amount: float, user_id: int):
+    """Background task to create the Stripe PaymentIntent for a pending order"""
+    try:
+        payment_intent = stripe.PaymentIntent.create(
+            amount=int(total_amount * 100),  # Stripe uses cents
+            currency="usd",
+            payment_method_types=["card"],
+            metadata={"user_id": user_id, "order_id": order_id}
+        )
+    except Exception as e:
+        # Log the error securely, avoid logging sensitive parts of the exception if possible
+        # The order stays PENDING without a payment_id so it can be retried
+        logger.error(f"Stripe PaymentIntent creation failed for order {order_id}: {type(e).__name__}")
         return
 
+    db = SessionLocal()
     try:
-        # Use a transaction for atomic updates
-        for item in order.items:
-            if item.product_id:
-                # Use SQL update with atomic operation to prevent race conditions
-                result = db.execute(
-                    """
-                    UPDATE products 
-                    SET stock = stock - :quantity 
-                    WHERE id = :product_id AND stock >= :quantity
-                    """,
-                    {"quantity": item.quantity, "product_id": item.product_id}
-                )
-                
-                if result.rowcount == 0:  # No row was updated (insufficient stock)
-                    logger.error(f"Insufficient stock for product {item.product_id} during order {order_id} processing.")
-                    # Consider adding order status update or notification here
-        
+        db.query(Order).filter(Order.id == order_id).update(
+            {Order.payment_id: payment_intent.id, Order.version_id: Order.version_id + 1},
+            synchronize_session=False
+        )
         db.commit()
-        logger.info(f"Successfully updated stock for order {order_id}")
     except Exception as e:
-        logger.error(f"Error committing stock updates for order {order_id}: {e}")
+        logger.error(f"Error storing payment ID for order {order_id}: {e}")
         db.rollback()
+    finally:
+        db.close()
 
 @router.post("/", response_model=OrderSchema)
 async def create_order(
@@ -96,13 +123,15 @@ async def create_order(
     db: Session = Depends(get_db),
     background_tasks: BackgroundTasks,
     order_in: OrderCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
 ) -> Any:
     """
     Create new order from user's cart
     """
     # Get user's cart
-    cart = db.query(Cart).filter(Cart.user_id == current_user.id).first()
+    cart = db.query(Cart).options(selectinload(Cart.items)).filter(
+        Cart.user_id == current_user.id
+    ).first()
     if not cart or not cart.items:
         raise HTTPException(status_code=400, detail="Cart is empty")
     
@@ -110,12 +139,19 @@ async def create_order(
     total_amount = 0
     order_items = []
     
+    # Load all products in the cart with a single query
+    product_ids = [cart_item.product_id for cart_item in cart.items]
+    products = {
+        product.id: product
+        for product in db.query(Product).filter(
+            Product.id.in_(product_ids),
+            Product.is_active == True
+        ).all()
+    }
+
     # Check product availability and gather order items
     for cart_item in cart.items:
-        product = db.query(Product).filter(
-            Product.id == cart_item.product_id,
-            Product.is_active == True
-        ).first()
+        product = products.get(cart_item.product_id)
         
         if not product:
             raise HTTPException(
@@ -139,112 +175,103 @@ async def create_order(
             "unit_price": product.price
         })
     
-    # Create payment intent with Stripe if API key is configured and valid
-    payment_id = None
-    if stripe_available:
-        try:
-            # Create a payment intent
-            payment_intent = stripe.PaymentIntent.create(
-                amount=int(total_amount * 100),  # Stripe uses cents
-                currency="usd",
-                payment_method_types=["card"],
-                metadata={"user_id": current_user.id, "order_id": "pending"} # Add pending order ID placeholder
-            )
-            payment_id = payment_intent.id
-        except Exception as e:
-            # Log the error securely, avoid logging sensitive parts of the exception if possible
-            logger.error(f"Stripe PaymentIntent creation failed for user {current_user.id}: {type(e).__name__}")
-            # Depending on policy, you might want to raise an HTTPException here
-            # raise HTTPException(status_code=500, detail="Payment processing failed.")
-            # For now, we allow order creation without payment_id if Stripe fails
-
-    # Create the order
+    # Create the order. The Stripe PaymentIntent is created after the response
+    # is sent so the request never blocks on (or holds a transaction across)
+    # the Stripe API call; payment_id is filled in by create_payment_intent.
     order = Order(
         user_id=current_user.id,
         total_amount=total_amount,
         shipping_address=order_in.shipping_address, # Consider adding validation for address format/content
         status=OrderStatus.PENDING,
-        payment_id=payment_id
+        payment_id=None
     )
     db.add(order)
-    db.commit()
-    db.refresh(order)
+    db.flush()
 
-    # Update Stripe metadata with the actual order ID if payment_id exists
-    if payment_id and stripe_available:
-        try:
-            stripe.PaymentIntent.modify(
-                payment_id,
-                metadata={"user_id": current_user.id, "order_id": order.id}
-            )
-        except Exception as e:
-            logger.error(f"Stripe PaymentIntent metadata update failed for order {order.id}: {type(e).__name__}")
-
-    # Create order items
-    for item_data in order_items:
-        order_item = OrderItem(
-            order_id=order.id,
-            **item_data
-        )
-        db.add(order_item)
+    # Create order items in one executemany batch, bypassing per-row unit-of-work
+    db.bulk_insert_mappings(
+        OrderItem,
+        [{"order_id": order.id, **item_data} for item_data in order_items]
+    )
     
-    # For development mode without Stripe, or if Stripe failed, mark as PAID and process
-    # NOTE: In production with Stripe enabled, payment confirmation (e.g., via webhook)
-    # should trigger the status change to PAID and the stock update.
-    # This immediate change is primarily for local dev or non-Stripe setups.
-    if not stripe_available or not payment_id:
+    if stripe_available:
+        background_tasks.add_task(create_payment_intent, order.id, total_amount, current_user.id)
+    else:
+        # For development mode without Stripe, mark as PAID and process
+        # NOTE: In production with Stripe enabled, payment confirmation (e.g., via webhook)
+        # should trigger the status change to PAID and the stock update.
         order.status = OrderStatus.PAID
-        # Update product stock in background only if marked as PAID immediately
-        background_tasks.add_task(process_order_after_payment, db, order.id)
 
-    db.commit()
-    db.refresh(order)
-    
-    # Clear the user's cart after order is placed
+    # Clear the user's cart with a single DELETE in the same transaction
     # Consider moving cart clearing until after successful payment confirmation in a production Stripe flow
-    for cart_item in cart.items:
-        db.delete(cart_item)
+    db.execute(delete(CartItem).where(CartItem.cart_id == cart.id))
+
+    # Queue the confirmation email in the outbox so it commits (or rolls back)
+    # with the order; the worker sends it
+    order_data = {
+        "id": order.id,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "total_amount": order.total_amount,
+        "status": order.status.value,
+        "shipping_address": order.shipping_address,
+        # Built from the rows we just inserted rather than reloading order.items
+        "items": [
+            {
+                "product_name": item["product_name"],
+                "quantity": item["quantity"],
+                "unit_price": item["unit_price"]
+            }
+            for item in order_items
+        ]
+    }
+    db.add(Outbox(
+        kind=ORDER_CONFIRMATION,
+        payload={"to_email": current_user.email, "order": order_data}
+    ))
+
+    # Order, items, cart clearing and the outbox row are committed together
     db.commit()
-    
-    # If order was immediately marked PAID, the background task is already added.
-    # If using Stripe webhooks, the background task should be triggered there.
+    db.refresh(order)
+    _queue_outbox_dispatch(background_tasks)
 
-    # After creating the order, add email notification task
-    if order:
-        # Prepare order data
-        order_data = {
-            "id": order.id,
-            "created_at": order.created_at.isoformat(),
-            "total_amount": order.total_amount,
-            "status": order.status,
-            "shipping_address": order.shipping_address,
-            "items": [
-                {
-                    "product_name": item.product_name,
-                    "quantity": item.quantity,
-                    "unit_price": item.unit_price
-                }
-                for item in order.items
-            ]
-        }
-        
-        # Send order confirmation email as background task
-        background_tasks.add_task(
-            email_service.send_order_confirmation,
-            current_user.email,
-            order_data
-        )
+    if order.status == OrderStatus.PAID:
+        # Update product stock in the worker, which uses its own session.
+        # Queued only after the commit so the worker sees the PAID order.
+        await _queue_stock_update(background_tasks, order.id)
     
     return order
 
-# When implementing the webhook endpoint, consider these security improvements:
+# Stripe events are a few KB; anything near this is not a real delivery
+_WEBHOOK_MAX_BYTES = 65536
+
 @router.post("/webhook/stripe", include_in_schema=False)
+@limiter.limit(settings.RATE_LIMIT_WEBHOOK)
 async def stripe_webhook(request: Request, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
-    # Add rate limiting for this endpoint to prevent DoS attacks
-    
-    # Set a reasonable size limit for the payload
+    # Reject on headers before buffering anything into memory
+    if not request.headers.get("content-type", "").startswith("application/json"):
+        logger.warning("Webhook with unexpected content type")
+        raise HTTPException(status_code=400, detail="Invalid content type")
+    raw_length = request.headers.get("content-length")
+    if raw_length is None:
+        # Stripe always sends a length; without one (e.g. a chunked body) the
+        # body can't be bounded up front
+        logger.warning("Webhook without a content-length")
+        raise HTTPException(status_code=411, detail="Content-Length required")
+    try:
+        content_length = int(raw_length)
+    except ValueError:
+        logger.warning(f"Webhook with invalid content-length: {raw_length!r}")
+        raise HTTPException(status_code=400, detail="Invalid Content-Length")
+    if content_length <= 0:
+        logger.warning("Webhook with an empty payload")
+        raise HTTPException(status_code=400, detail="Empty payload")
+    if content_length > _WEBHOOK_MAX_BYTES:
+        logger.warning(f"Webhook rejected by content-length: {content_length}")
+        raise HTTPException(status_code=400, detail="Payload too large")
+
+    # Content-Length can't be trusted on its own, so check the body too
     payload = await request.body()
-    if len(payload) > 65536:  # Example: 64KB limit
+    if len(payload) > _WEBHOOK_MAX_BYTES:
         logger.warning("Webhook payload too large")
         raise HTTPException(status_code=400, detail="Payload too large")
         
@@ -259,10 +286,14 @@ async def stripe_webhook(request: Request, background_tasks: BackgroundTasks, db
         raise HTTPException(status_code=500, detail="Webhook not configured.")
     
     try:
-        event = stripe.Webhook.construct_event(
-            payload, sig_header, settings.STRIPE_WEBHOOK_SECRET
+        # Verify the HMAC signature, then parse the raw payload with orjson
+        # instead of having construct_event build a StripeObject tree
+        stripe.WebhookSignature.verify_header(
+            payload.decode("utf-8"), sig_header, settings.STRIPE_WEBHOOK_SECRET,
+            tolerance=stripe.Webhook.DEFAULT_TOLERANCE
         )
-    except ValueError as e:
+        event = orjson.loads(payload)
+    except ValueError as e:  # Includes UnicodeDecodeError and orjson.JSONDecodeError
         # Invalid payload
         logger.error(f"Invalid Stripe webhook payload: {e}")
         raise HTTPException(status_code=400, detail="Invalid payload")
@@ -271,11 +302,22 @@ async def stripe_webhook(request: Request, background_tasks: BackgroundTasks, db
         logger.error(f"Invalid Stripe webhook signature: {e}")
         raise HTTPException(status_code=400, detail="Invalid signature")
     
-    # Add idempotency check to prevent duplicate processing
+    # Idempotency: Stripe retries deliveries, so each event is handled once.
+    # Redis is a fast path for recent duplicates; the stripe_events insert is
+    # authoritative and commits together with the order changes below.
     event_id = event['id']
-    # Check if this event was already processed (using Redis or DB)
-    # if event_already_processed(event_id):
-    #     return {"status": "already processed"}
+    redis_key = f"stripe:evt:{event_id}"
+    if redis_client:
+        try:
+            if await redis_client.get(redis_key):
+                return {"status": "already processed"}
+        except Exception as e:
+            logger.warning(f"Redis get error for key {redis_key}: {e}")
+
+    if not _record_stripe_event(db, event_id):
+        db.rollback()
+        logger.info(f"Duplicate Stripe webhook {event_id} ignored.")
+        return {"status": "already processed"}
     
     if event['type'] == 'payment_intent.succeeded':
         payment_intent = event['data']['object']
@@ -284,11 +326,20 @@ async def stripe_webhook(request: Request, background_tasks: BackgroundTasks, db
             order = db.query(Order).filter(Order.id == int(order_id)).first()
             if order and order.status == OrderStatus.PENDING:
                 order.status = OrderStatus.PAID
-                order.payment_id = payment_intent.id # Ensure payment ID is stored
+                order.payment_id = payment_intent['id'] # Ensure payment ID is stored
                 db.add(order)
-                db.commit()
-                # Trigger background task for stock update now that payment is confirmed
-                background_tasks.add_task(process_paid_order, order_id)
+                try:
+                    db.commit()
+                except StaleDataError:
+                    # A concurrent delivery changed the order first (version_id mismatch)
+                    db.rollback()
+                    db.refresh(order)
+                    if order.status != OrderStatus.PENDING:
+                        logger.info(f"Order {order_id} already processed; ignoring webhook {event['id']}.")
+                        return {"status": "already processed"}
+                    raise HTTPException(status_code=409, detail="Order was modified concurrently")
+                # Queue the stock update now that payment is confirmed
+                await _queue_stock_update(background_tasks, order.id)
                 logger.info(f"Order {order_id} marked as PAID via Stripe webhook.")
             else:
                 logger.warning(f"Order {order_id} not found or not PENDING for webhook {event['id']}.")
@@ -304,22 +355,19 @@ async def stripe_webhook(request: Request, background_tasks: BackgroundTasks, db
     
     else:
         logger.info(f"Unhandled Stripe event type {event['type']}")
+
+    # Commit the event record (a no-op for the order branch, which committed above)
+    db.commit()
+    if redis_client:
+        try:
+            await redis_client.set(redis_key, 1, ex=86400)
+        except Exception as e:
+            logger.warning(f"Redis set error for key {redis_key}: {e}")
     
     return {"status": "success"}
 
-# Fix process_paid_order to avoid circular import issues
-def process_paid_order(order_id: int):
-    """Process a paid order in a background task with a fresh DB session"""
-    db = SessionLocal()
-    try:
-        # Process the order with a new session
-        order = db.query(Order).filter(Order.id == order_id).first()
-        if order and order.status == OrderStatus.PAID:
-            # Process the stock updates
-            process_order_after_payment(db, order_id)
-            logger.info(f"Order {order_id} processed successfully in background task")
-    except Exception as e:
-        logger.error(f"Error processing paid order {order_id}: {e}")
-        db.rollback()
-    finally:
-        db.close()
+def _record_stripe_event(db: Session, event_id: str) -> bool:
+    """Insert the event ID, returning False if it was already recorded"""
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    stmt = dialect.insert(StripeEvent).values(event_id=event_id).on_conflict_do_nothing()
+    return db.execute(stmt).rowcount == 1
@@ -1,26 +1,37 @@
 from typing import Any, List, Optional, Tuple
+import threading
 
+from cachetools import TTLCache
 from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import or_, and_, func, desc
+from sqlalchemy import or_, and_, func, desc, select
 
-from app.api.deps import get_current_active_admin, get_db, limit_query_factory
-from app.core.database import get_db
+from app.api.deps import CurrentUser, get_current_active_admin, paginate
+from app.core.database import get_async_db, get_db
 from app.models.product import Product
-from app.models.user import User
 from app.schemas.product import Product as ProductSchema, ProductCreate, ProductUpdate
-from app.core.cache import cache_response, invalidate_cache
+from app.core.cache import cache_response, invalidate_cache_tag
 
 router = APIRouter()
 
-# Create a limiter for product queries
-limit_product_query = limit_query_factory(max_limit=100, default_limit=20)
+# Per-process cache of active products by ID, in front of the database.
+# Admin writes evict entries only in the process that handled them, so other
+# workers (and stock changes from orders) catch up within the TTL; keep it
+# short enough that stale stock and deleted products don't linger.
+_product_cache: TTLCache = TTLCache(maxsize=10_000, ttl=5)
+_product_cache_lock = threading.Lock()
+
+def _evict_product(product_id: int) -> None:
+    """Drop a product from the in-process cache after an admin write"""
+    with _product_cache_lock:
+        _product_cache.pop(product_id, None)
 
 @router.get("/", response_model=List[ProductSchema])
 @cache_response(prefix="products", expire_seconds=300)  # Cache for 5 minutes
 async def get_products(
-    db: Session = Depends(get_db),
-    pagination: Tuple[int, int] = Depends(limit_product_query),
+    db: AsyncSession = Depends(get_async_db),
+    pagination: Tuple[int, int] = Depends(paginate),
     category: Optional[str] = None,
     min_price: Optional[float] = Query(None, ge=0),  # Ensure non-negative price
     max_price: Optional[float] = Query(None, ge=0),  # Ensure non-negative price
@@ -30,20 +41,20 @@ async def get_products(
     Retrieve products with optional filtering
     """
     skip, limit = pagination  # Unpack the pagination values
-    query = db.query(Product).filter(Product.is_active == True)
+    stmt = select(Product).where(Product.is_active.is_(True))
     
     if category:
-        query = query.filter(Product.category == category)
+        stmt = stmt.where(Product.category == category)
     
     if min_price is not None:
-        query = query.filter(Product.price >= min_price)
+        stmt = stmt.where(Product.price >= min_price)
     
     if max_price is not None:
-        query = query.filter(Product.price <= max_price)
+        stmt = stmt.where(Product.price <= max_price)
     
     if search:
         # Use more efficient ILIKE with index if available
-        query = query.filter(
+        stmt = stmt.where(
             or_(
                 Product.name.ilike(f"%{search}%"),
                 Product.description.ilike(f"%{search}%")
@@ -51,8 +62,9 @@ async def get_products(
         )
     
     # Apply limits for security and performance
-    products = query.offset(skip).limit(limit).all()
-    return products
+    result = await db.execute(stmt.offset(skip).limit(limit))
+    # Return schema models so cache_response can serialize them
+    return [ProductSchema.model_validate(product) for product in result.scalars()]
 
 @router.get("/{product_id}", response_model=ProductSchema)
 def get_product(
@@ -63,17 +75,27 @@ def get_product(
     """
     Get product by ID
     """
+    with _product_cache_lock:
+        cached = _product_cache.get(product_id)
+    if cached is not None:
+        return cached
+
     product = db.query(Product).filter(Product.id == product_id, Product.is_active == True).first()
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
-    return product
+
+    # Cache the schema model rather than the session-bound ORM instance
+    product_out = ProductSchema.model_validate(product)
+    with _product_cache_lock:
+        _product_cache[product_id] = product_out
+    return product_out
 
 @router.post("/", response_model=ProductSchema)
 async def create_product(
     *,
     db: Session = Depends(get_db),
     product_in: ProductCreate,
-    current_user: User = Depends(get_current_active_admin),
+    current_user: CurrentUser = Depends(get_current_active_admin),
 ) -> Any:
     """
     Create new product (admin only)
@@ -85,13 +107,13 @@ async def create_product(
             detail="Product with this SKU already exists",
         )
     
-    product = Product(**product_in.dict())
+    product = Product(**product_in.model_dump())
     db.add(product)
     db.commit()
     db.refresh(product)
     
     # Invalidate product cache
-    await invalidate_cache("products:*")
+    await invalidate_cache_tag("products")
     
     return product
 
@@ -101,7 +123,7 @@ async def update_product(
     db: Session = Depends(get_db),
     product_id: int,
     product_in: ProductUpdate,
-    current_user: User = Depends(get_current_active_admin),
+    current_user: CurrentUser = Depends(get_current_active_admin),
 ) -> Any:
     """
     Update a product (admin only)
@@ -110,7 +132,7 @@ async def update_product(
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
     
-    update_data = product_in.dict(exclude_unset=True)
+    update_data = product_in.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         setattr(product, field, value)
     
@@ -119,7 +141,8 @@ async def update_product(
     db.refresh(product)
     
     # Invalidate product cache
-    await invalidate_cache("products:*")
+    _evict_product(product_id)
+    await invalidate_cache_tag("products")
     
     return product
 
@@ -128,7 +151,7 @@ async def delete_product(
     *,
     db: Session = Depends(get_db),
     product_id: int,
-    current_user: User = Depends(get_current_active_admin),
+    current_user: CurrentUser = Depends(get_current_active_admin),
 ) -> Any:
     """
     Delete a product (admin only)
@@ -144,6 +167,7 @@ async def delete_product(
     db.refresh(product)
     
     # Invalidate product cache
-    await invalidate_cache("products:*")
+    _evict_product(product_id)
+    await invalidate_cache_tag("products")
     
     return product
@@ -3,7 +3,7 @@ from typing import Any
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 
-from app.api.deps import get_current_user
+from app.api.deps import CurrentUser, get_current_user, invalidate_user_cache
 from app.core.database import get_db
 from app.core.security import get_password_hash
 from app.models.user import User
@@ -11,26 +11,36 @@ from app.schemas.user import User as UserSchema, UserUpdate
 
 router = APIRouter()
 
+def _get_user_row(db: Session, user_id: int) -> User:
+    """Load the full user row for the authenticated user"""
+    user = db.query(User).filter(User.id == user_id).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    return user
+
 @router.get("/me", response_model=UserSchema)
 def get_current_user_info(
-    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
 ) -> Any:
     """
     Get current user information
     """
-    return current_user
+    return _get_user_row(db, current_user.id)
 
 @router.put("/me", response_model=UserSchema)
 def update_user(
     *,
     db: Session = Depends(get_db),
     user_in: UserUpdate,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
 ) -> Any:
     """
     Update own user information
     """
-    if user_in.username and user_in.username != current_user.username:
+    user = _get_user_row(db, current_user.id)
+
+    if user_in.username and user_in.username != user.username:
         existing_user = db.query(User).filter(User.username == user_in.username).first()
         if existing_user:
             raise HTTPException(
@@ -38,7 +48,7 @@ def update_user(
                 detail="Username already registered",
             )
     
-    if user_in.email and user_in.email != current_user.email:
+    if user_in.email and user_in.email != user.email:
         existing_user = db.query(User).filter(User.email == user_in.email).first()
         if existing_user:
             raise HTTPException(
@@ -46,7 +56,7 @@ def update_user(
                 detail="Email already registered",
             )
     
-    user_data = user_in.dict(exclude_unset=True)
+    user_data = user_in.model_dump(exclude_unset=True)
 
     # Prevent users from updating sensitive fields themselves
     user_data.pop("is_admin", None)
@@ -57,9 +67,12 @@ def update_user(
         del user_data["password"]
     
     for field, value in user_data.items():
-        setattr(current_user, field, value)
+        setattr(user, field, value)
     
-    db.add(current_user)
+    db.add(user)
     db.commit()
-    db.refresh(current_user)
-    return current_user
+    db.refresh(user)
+
+    # Cached auth data may now be stale (e.g. email changed)
+    invalidate_user_cache(user.id)
+    return user
@@ -1,11 +1,13 @@
 from typing import Any, List
 
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 
-from app.api.deps import get_current_user, get_db
-from app.models.user import User
+from app.api.deps import CurrentUser, get_current_user, get_db
+from app.core.database import get_async_db
 from app.models.product import Product
 from app.models.wishlist import WishlistItem
 from app.schemas.product import Product as ProductSchema
@@ -14,18 +16,18 @@ router = APIRouter()
 
 @router.get("/", response_model=List[ProductSchema])
 async def get_wishlist(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user),
 ) -> Any:
     """
     Get current user's wishlist
     """
-    wishlist_items = (
-        db.query(Product)
+    result = await db.execute(
+        select(Product)
         .join(WishlistItem, WishlistItem.product_id == Product.id)
-        .filter(WishlistItem.user_id == current_user.id, Product.is_active == True)
-        .all()
+        .where(WishlistItem.user_id == current_user.id, Product.is_active.is_(True))
     )
+    wishlist_items = result.scalars().all()
     
     return wishlist_items
 
@@ -33,7 +35,7 @@ async def get_wishlist(
 async def add_to_wishlist(
     product_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
 ) -> Any:
     """
     Add a product to the wishlist
@@ -63,20 +65,25 @@ async def add_to_wishlist(
 async def remove_from_wishlist(
     product_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
 ) -> Any:
     """
     Remove a product from the wishlist
     """
-    wishlist_item = db.query(WishlistItem).filter(
-        WishlistItem.user_id == current_user.id,
-        WishlistItem.product_id == product_id
-    ).first()
+    # Single DELETE; RETURNING tells us whether anything matched
+    result = db.execute(
+        delete(WishlistItem)
+        .where(
+            WishlistItem.user_id == current_user.id,
+            WishlistItem.product_id == product_id
+        )
+        .returning(WishlistItem.id)
+    )
     
-    if not wishlist_item:
+    if result.first() is None:
+        db.rollback()
         raise HTTPException(status_code=404, detail="Product not found in wishlist")
     
-    db.delete(wishlist_item)
     db.commit()
     
     return {"message": "Product removed from wishlist"}
@@ -1,25 +1,28 @@
-import json
+import hashlib
 import logging
 import asyncio
+from decimal import Decimal
 from typing import Any, Optional, TypeVar, Callable
-import redis.asyncio as redis
+import orjson
 from functools import wraps
 
-from app.core.config import settings
+from pydantic import BaseModel
 
-logger = logging.getLogger(__name__)
+from app.core.redis import redis_client
 
-# Connect to Redis if URL is set
-redis_client = None
-if settings.REDIS_URL:
-    try:
-        redis_client = redis.from_url(settings.REDIS_URL, encoding="utf-8", decode_responses=True)
-    except Exception as e:
-        logger.warning(f"Failed to connect to Redis: {e}")
+logger = logging.getLogger(__name__)
 
 T = TypeVar('T')
 
-async def get_cached_data(key: str) -> Optional[str]:
+def _orjson_default(obj: Any) -> Any:
+    """Encode the types orjson doesn't handle natively (datetimes it does)"""
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError(f"Type is not cacheable: {type(obj).__name__}")
+
+async def get_cached_data(key: str) -> Optional[bytes]:
     """Get data from Redis cache."""
     if not redis_client:
         return None
@@ -31,57 +34,108 @@ async def get_cached_data(key: str) -> Optional[str]:
         logger.warning(f"Redis get error for key {key}: {e}")
         return None
 
-async def set_cached_data(key: str, data: str, expire_seconds: int = 3600) -> bool:
-    """Set data in Redis cache with expiration."""
+# Invalidation works in batches so no single UNLINK call gets too large
+_INVALIDATE_BATCH_SIZE = 500
+
+def _tag_key(tag: str) -> str:
+    """Redis set holding every cache key written under a tag"""
+    return f"{tag}:tags"
+
+async def set_cached_data(
+    key: str, data: bytes, expire_seconds: int = 3600, tag: Optional[str] = None
+) -> bool:
+    """Set data in Redis cache with expiration, optionally recording it under a tag."""
     if not redis_client:
         return False
     
     try:
-        await redis_client.set(key, data, ex=expire_seconds)
+        async with redis_client.pipeline(transaction=False) as pipe:
+            pipe.set(key, data, ex=expire_seconds)
+            if tag:
+                # The tag set lives as long as its newest member
+                pipe.sadd(_tag_key(tag), key)
+                pipe.expire(_tag_key(tag), expire_seconds)
+            await pipe.execute()
         return True
     except Exception as e:
         logger.warning(f"Redis set error for key {key}: {e}")
         return False
 
 async def invalidate_cache(pattern: str) -> None:
-    """Invalidate cache entries matching a pattern."""
+    """Invalidate cache entries matching a pattern.
+
+    Uses incremental SCAN rather than KEYS so Redis is never blocked walking
+    the whole keyspace, and UNLINK so memory is reclaimed in the background.
+    """
     if not redis_client:
         return
     
     try:
-        keys = await redis_client.keys(pattern)
-        if keys:
-            await redis_client.delete(*keys)
-            logger.debug(f"Invalidated {len(keys)} cache entries matching '{pattern}'")
+        count = 0
+        batch = []
+        async for key in redis_client.scan_iter(match=pattern, count=_INVALIDATE_BATCH_SIZE):
+            batch.append(key)
+            if len(batch) >= _INVALIDATE_BATCH_SIZE:
+                await redis_client.unlink(*batch)
+                count += len(batch)
+                batch.clear()
+        if batch:
+            await redis_client.unlink(*batch)
+            count += len(batch)
+        if count:
+            logger.debug(f"Invalidated {count} cache entries matching '{pattern}'")
     except Exception as e:
         logger.warning(f"Redis invalidation error for pattern {pattern}: {e}")
 
+async def invalidate_cache_tag(tag: str) -> None:
+    """Invalidate every cache entry written under a tag.
+
+    Costs O(entries invalidated) instead of a scan over the keyspace.
+    """
+    if not redis_client:
+        return
+    
+    try:
+        keys = list(await redis_client.smembers(_tag_key(tag)))
+        for i in range(0, len(keys), _INVALIDATE_BATCH_SIZE):
+            await redis_client.unlink(*keys[i:i + _INVALIDATE_BATCH_SIZE])
+        await redis_client.unlink(_tag_key(tag))
+        if keys:
+            logger.debug(f"Invalidated {len(keys)} cache entries tagged '{tag}'")
+    except Exception as e:
+        logger.warning(f"Redis invalidation error for tag {tag}: {e}")
+
 def cache_response(prefix: str, expire_seconds: int = 3600):
     """Decorator to cache API responses."""
     def decorator(func):
+        # Without Redis, or for non-async endpoints, don't wrap at all so
+        # the request path pays nothing for caching
+        if redis_client is None or not asyncio.iscoroutinefunction(func):
+            return func
+
+        dumps, loads = orjson.dumps, orjson.loads
+        key_prefix = f"{prefix}:{func.__name__}:"
+
         @wraps(func)
         async def wrapper(*args, **kwargs):
-            # For non-async endpoints, simply pass through
-            if not asyncio.iscoroutinefunction(func):
-                return func(*args, **kwargs)
-                
-            # Generate cache key from function name and arguments
-            key_parts = [prefix, func.__name__]
-            
-            # Add sorted kwargs to ensure consistent key ordering
-            sorted_kwargs = sorted(kwargs.items())
-            for k, v in sorted_kwargs:
-                if k != "db" and k != "current_user":  # Skip DB and user objects
-                    key_parts.append(f"{k}:{v}")
-            
-            cache_key = ":".join(key_parts)
+            # Generate cache key from function name and a digest of the
+            # canonical (sorted, JSON-encoded) arguments
+            payload = {
+                k: v for k, v in kwargs.items()
+                if k not in ("db", "current_user")  # Skip DB and user objects
+            }
+            digest = hashlib.blake2b(
+                dumps(payload, option=orjson.OPT_SORT_KEYS, default=str),
+                digest_size=16
+            ).hexdigest()
+            cache_key = key_prefix + digest
             
             # Try to get from cache
             cached_result = await get_cached_data(cache_key)
             if cached_result:
                 try:
-                    return json.loads(cached_result)
-                except json.JSONDecodeError:
+                    return loads(cached_result)
+                except orjson.JSONDecodeError:
                     # If cached data is corrupted, proceed with normal execution
                     pass
             
@@ -90,8 +144,10 @@ def cache_response(prefix: str, expire_seconds: int = 3600):
             
             # Cache the result
             try:
-                await set_cached_data(cache_key, json.dumps(result), expire_seconds)
-            except (TypeError, ValueError) as e:
+                await set_cached_data(
+                    cache_key, dumps(result, default=_orjson_default), expire_seconds, tag=prefix
+                )
+            except TypeError as e:  # orjson.JSONEncodeError subclasses TypeError
                 logger.warning(f"Could not cache response: {e}")
             
             return result
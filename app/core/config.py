@@ -1,9 +1,9 @@
 import secrets
-from typing import Any, Dict, Optional
+from typing import Annotated, Any, Dict, List, Optional
 
 # For Pydantic v2.x
-from pydantic_settings import BaseSettings
-from pydantic import validator
+from pydantic_settings import BaseSettings, NoDecode
+from pydantic import field_validator
 
 
 class Settings(BaseSettings):
@@ -13,12 +13,30 @@ class Settings(BaseSettings):
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    # bcrypt work factor; each step doubles hashing time. Calibrate with
+    # scripts/calibrate_bcrypt.py and only lower it outside production.
+    BCRYPT_ROUNDS: int = 12
     
     # DATABASE
     DATABASE_URL: Optional[str] = None
+    DB_POOL_SIZE: int = 20
+    DB_MAX_OVERFLOW: int = 40
+    DB_POOL_TIMEOUT: int = 30
+    DB_POOL_RECYCLE: int = 1800
+    # The async engine has its own pool on top of the sync one; it serves
+    # only the read endpoints and the worker's jobs, so it is kept smaller
+    DB_ASYNC_POOL_SIZE: int = 5
+    DB_ASYNC_MAX_OVERFLOW: int = 10
+    # Disable async engine pooling when an external pooler (pgbouncer in
+    # transaction mode) sits in front of PostgreSQL
+    DB_ASYNC_NULLPOOL: bool = False
+    SLOW_QUERY_THRESHOLD_MS: int = 100
+    # Requests slower than this are logged at INFO even when successful
+    SLOW_REQUEST_THRESHOLD_MS: int = 500
     
     # REDIS
     REDIS_URL: str = "redis://redis:6379/0"
+    REDIS_MAX_CONNECTIONS: int = 50
     
     # STRIPE
     STRIPE_API_KEY: Optional[str] = None
@@ -32,8 +50,9 @@ class Settings(BaseSettings):
     SMTP_PASSWORD: Optional[str] = None
     FROM_EMAIL: str = "noreply@example.com"
     
-    # CORS
-    CORS_ORIGINS: Optional[str] = None
+    # CORS: comma-separated in the environment, a list once loaded.
+    # NoDecode stops pydantic-settings from parsing the value as JSON first.
+    CORS_ORIGINS: Annotated[Optional[List[str]], NoDecode] = None
     
     # ENVIRONMENT
     ENVIRONMENT: str = "development"
@@ -45,6 +64,14 @@ class Settings(BaseSettings):
     ENABLE_RATE_LIMITING: bool = True
     RATE_LIMIT_DEFAULT: str = "60/minute"
     RATE_LIMIT_LOGIN: str = "10/minute"
+    RATE_LIMIT_WEBHOOK: str = "300/minute"  # Stripe delivers from a small set of IPs
+
+    @field_validator("CORS_ORIGINS", mode="before")
+    @classmethod
+    def split_cors_origins(cls, v: Any) -> Any:
+        if isinstance(v, str):
+            return [origin.strip() for origin in v.split(",") if origin.strip()]
+        return v
 
     class Config:
         env_file = ".env"
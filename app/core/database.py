@@ -1,9 +1,17 @@
-from sqlalchemy import create_engine
+import time
+import logging
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 
 from app.core.config import settings
 
+logger = logging.getLogger(__name__)
+
 if settings.DATABASE_URL is None:
     raise ValueError("DATABASE_URL is not set in environment variables")
 
@@ -13,9 +21,55 @@ if settings.DATABASE_URL.startswith("sqlite"):
         settings.DATABASE_URL, connect_args={"check_same_thread": False}
     )
 else:
-    engine = create_engine(settings.DATABASE_URL)
+    engine = create_engine(
+        settings.DATABASE_URL,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_pre_ping=True,  # Detect stale connections before use
+        pool_recycle=settings.DB_POOL_RECYCLE,
+    )
+
+# Async engine for read-heavy endpoints, on the same database with an async driver
+_ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+_async_url = make_url(settings.DATABASE_URL)
+_async_url = _async_url.set(drivername=_ASYNC_DRIVERS.get(_async_url.get_backend_name(), _async_url.drivername))
+
+if _async_url.get_backend_name() == "sqlite":
+    async_engine = create_async_engine(_async_url)
+elif settings.DB_ASYNC_NULLPOOL:
+    # pgbouncer does the pooling; holding connections here would defeat it.
+    # Transaction-mode pgbouncer also can't keep asyncpg's prepared statements.
+    async_engine = create_async_engine(
+        _async_url.update_query_dict({"prepared_statement_cache_size": "0"}),
+        poolclass=NullPool,
+        connect_args={"statement_cache_size": 0},
+    )
+else:
+    async_engine = create_async_engine(
+        _async_url,
+        pool_size=settings.DB_ASYNC_POOL_SIZE,
+        max_overflow=settings.DB_ASYNC_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_pre_ping=True,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+    )
+
+# Log statements slower than SLOW_QUERY_THRESHOLD_MS
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed_ms = (time.perf_counter() - conn.info["query_start_time"].pop()) * 1000
+    if elapsed_ms > settings.SLOW_QUERY_THRESHOLD_MS:
+        logger.warning(f"Slow query ({elapsed_ms:.1f}ms): {statement}")
+
+for _engine in (engine, async_engine.sync_engine):
+    event.listen(_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(_engine, "after_cursor_execute", _after_cursor_execute)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 
 Base = declarative_base()
 
@@ -26,3 +80,8 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -2,28 +2,206 @@ from slowapi import Limiter
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 from slowapi.middleware import SlowAPIMiddleware
-from fastapi.responses import JSONResponse
-import redis.asyncio as redis
+from fastapi.responses import Response
+from limits.storage import RedisStorage
+import orjson
+import itertools
 import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, Tuple
 
 from app.core.config import settings
 
+logger = logging.getLogger(__name__)
+
+# How often locally counted hits are pushed to Redis
+_FLUSH_INTERVAL = 0.02
+# How often expired windows are dropped from the local view
+_PRUNE_INTERVAL = 1.0
+
+
+class BatchedRedisStorage(RedisStorage):
+    """
+    Fixed-window counters served from process memory and synced to Redis.
+
+    The first hit on a key in a window goes to Redis as usual; later hits
+    only bump a local counter, and a background thread flushes the deltas
+    with one pipelined INCRBY/EXPIRE round trip per interval, refreshing the
+    local totals from Redis. Other processes' hits are therefore seen up to
+    one flush interval late. Moving-window limits bypass the local counters.
+    """
+    STORAGE_SCHEME = ["batched+redis", "batched+rediss"]
+
+    def __init__(self, uri: str, **options):
+        super().__init__(uri.replace("batched+", "", 1), **options)
+        self._lock = threading.Lock()
+        # key -> (count, window end as epoch seconds)
+        self._counts: Dict[str, Tuple[int, float]] = {}
+        self._pending: Dict[str, int] = defaultdict(int)
+        self._expiries: Dict[str, int] = {}
+        self._flusher = None
+        self._pid = os.getpid()
+
+    def _check_fork(self) -> None:
+        # A forked child inherits the parent's counters and a _flusher that
+        # refers to a thread it doesn't have. The parent flushes its own
+        # pending hits, so the child starts empty and runs its own flusher
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._counts.clear()
+            self._pending.clear()
+            self._expiries.clear()
+            self._flusher = None
+
+    def _start_flusher(self) -> None:
+        self._flusher = threading.Thread(
+            target=self._flush_loop, name="ratelimit-flush", daemon=True
+        )
+        self._flusher.start()
+
+    def _flush_loop(self) -> None:
+        last_prune = time.time()
+        while True:
+            time.sleep(_FLUSH_INTERVAL)
+            try:
+                self._flush()
+            except Exception as e:
+                logger.warning(f"Rate limit flush failed: {e}")
+
+            now = time.time()
+            if now - last_prune >= _PRUNE_INTERVAL:
+                last_prune = now
+                with self._lock:
+                    for key in [k for k, (_, end) in self._counts.items() if end <= now]:
+                        del self._counts[key]
+                        self._expiries.pop(key, None)
+                        # Hits put back after a failed flush belong to the
+                        # window that just ended; don't carry them into the next
+                        self._pending.pop(key, None)
+
+    def _flush(self) -> None:
+        with self._lock:
+            if not self._pending:
+                return
+            pending, self._pending = self._pending, defaultdict(int)
+            expiries = {key: self._expiries[key] for key in pending}
+
+        pipe = self.storage.pipeline(transaction=False)
+        for key, delta in pending.items():
+            # Same Redis key the cold path and get() use
+            redis_key = self.prefixed_key(key)
+            pipe.incrby(redis_key, delta)
+            # Only sets the expiry if another writer hasn't already
+            pipe.expire(redis_key, expiries[key], nx=True)
+            pipe.pttl(redis_key)
+        try:
+            results = pipe.execute()
+        except Exception:
+            # Put the hits back so the next flush sends them; dropping them
+            # would under-count the shared limit while Redis is struggling
+            with self._lock:
+                for key, delta in pending.items():
+                    self._pending[key] += delta
+            raise
+
+        now = time.time()
+        with self._lock:
+            for i, key in enumerate(pending):
+                total, ttl_ms = results[3 * i], results[3 * i + 2]
+                if ttl_ms < 0:
+                    continue
+                # Keep hits counted locally since the swap above
+                self._counts[key] = (total + self._pending.get(key, 0), now + ttl_ms / 1000)
+
+    def incr(self, key: str, expiry: int, *args, amount: int = 1, **kwargs) -> int:
+        now = time.time()
+        with self._lock:
+            self._check_fork()
+            entry = self._counts.get(key)
+            if entry is not None and entry[1] > now:
+                count = entry[0] + amount
+                self._counts[key] = (count, entry[1])
+                self._pending[key] += amount
+                self._expiries[key] = expiry
+                if self._flusher is None:
+                    self._start_flusher()
+                return count
+
+        # Cold key: go to Redis so the window is shared with other processes
+        count = super().incr(key, expiry, *args, amount=amount, **kwargs)
+        window_end = super().get_expiry(key)
+        with self._lock:
+            self._counts[key] = (count + self._pending.get(key, 0), window_end)
+            self._expiries[key] = expiry
+        return count
+
+    def get(self, key: str) -> int:
+        with self._lock:
+            self._check_fork()
+            entry = self._counts.get(key)
+        if entry is not None and entry[1] > time.time():
+            return entry[0]
+        return super().get(key)
+
+    def get_expiry(self, key: str) -> float:
+        with self._lock:
+            self._check_fork()
+            entry = self._counts.get(key)
+        if entry is not None and entry[1] > time.time():
+            return entry[1]
+        return super().get_expiry(key)
+
+    def clear(self, key: str) -> None:
+        with self._lock:
+            self._counts.pop(key, None)
+            self._pending.pop(key, None)
+            self._expiries.pop(key, None)
+        super().clear(key)
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+            self._pending.clear()
+            self._expiries.clear()
+        return super().reset()
+
+
 # Use Redis for distributed rate limiting if REDIS_URL is set
 if settings.REDIS_URL:
-    redis_client = redis.from_url(settings.REDIS_URL, encoding="utf-8", decode_responses=True)
-    limiter = Limiter(key_func=get_remote_address, storage_uri=settings.REDIS_URL)
+    # limits drives Redis synchronously, so this storage keeps its own
+    # (sync) connection pool rather than sharing app.core.redis's async one
+    limiter = Limiter(key_func=get_remote_address, storage_uri=f"batched+{settings.REDIS_URL}")
 else:
     # Fallback to in-memory limiter (not suitable for multi-process/multi-instance deployments)
     limiter = Limiter(key_func=get_remote_address)
 
+# 429 bodies differ only by the limit that was hit, and there are only a few
+# configured limits, so each body is encoded once and reused
+_RATE_LIMIT_DETAIL = "Rate limit exceeded. Please try again later."
+_rate_limit_bodies: Dict[str, bytes] = {}
+
+# Log one in this many rate-limited requests so a flood of 429s doesn't
+# turn into a flood of log records
+_RATE_LIMIT_LOG_EVERY = 100
+_rate_limited_count = itertools.count()
+
 # Handler for rate limit exceeded errors
 async def _rate_limit_exceeded_handler(request, exc):
     """Handler for rate limit exceeded errors"""
-    logging.warning(f"Rate limit exceeded: {request.client.host} - {request.url.path}")
-    return JSONResponse(
-        status_code=429,
-        content={
-            "detail": "Rate limit exceeded. Please try again later.",
-            "limit": str(exc.detail) if hasattr(exc, "detail") else "Rate limit exceeded"
-        }
-    )
+    count = next(_rate_limited_count)
+    if count % _RATE_LIMIT_LOG_EVERY == 0:
+        logger.warning(
+            "Rate limit exceeded: %s - %s (%d rate-limited requests so far)",
+            request.client.host, request.url.path, count + 1
+        )
+
+    limit = str(exc.detail) if hasattr(exc, "detail") else "Rate limit exceeded"
+    body = _rate_limit_bodies.get(limit)
+    if body is None:
+        body = _rate_limit_bodies[limit] = orjson.dumps(
+            {"detail": _RATE_LIMIT_DETAIL, "limit": limit}
+        )
+    return Response(content=body, status_code=429, media_type="application/json")
@@ -0,0 +1,48 @@
+import logging
+
+import orjson
+import structlog
+
+from app.core.config import settings
+
+
+def _orjson_dumps(obj, default=None, **kwargs) -> str:
+    """JSONRenderer serializer; the stdlib handler needs str, not bytes"""
+    return orjson.dumps(obj, default=default).decode()
+
+
+def configure_logging() -> None:
+    """
+    Route all logging through structlog's JSON renderer.
+
+    Existing stdlib `logging.getLogger(...)` calls keep working: their
+    records are rendered by the same processors, so they pick up values
+    bound with structlog.contextvars (e.g. request_id) and any `extra` fields.
+    """
+    shared_processors = [
+        structlog.contextvars.merge_contextvars,
+        structlog.stdlib.add_logger_name,
+        structlog.stdlib.add_log_level,
+        structlog.processors.TimeStamper(fmt="iso", utc=True),
+    ]
+
+    structlog.configure(
+        processors=shared_processors + [structlog.stdlib.ProcessorFormatter.wrap_for_formatter],
+        logger_factory=structlog.stdlib.LoggerFactory(),
+        cache_logger_on_first_use=True,
+    )
+
+    formatter = structlog.stdlib.ProcessorFormatter(
+        foreign_pre_chain=shared_processors + [structlog.stdlib.ExtraAdder()],
+        processors=[
+            structlog.stdlib.ProcessorFormatter.remove_processors_meta,
+            structlog.processors.format_exc_info,
+            structlog.processors.JSONRenderer(serializer=_orjson_dumps),
+        ],
+    )
+
+    handler = logging.StreamHandler()
+    handler.setFormatter(formatter)
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(getattr(logging, settings.LOG_LEVEL, logging.INFO))
@@ -0,0 +1,55 @@
+import dataclasses
+import logging
+import time
+from typing import Any, Optional
+
+from arq import create_pool
+from arq.connections import ArqRedis, RedisSettings
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# None when REDIS_URL is unset; jobs then always run as BackgroundTasks
+redis_settings: Optional[RedisSettings] = (
+    RedisSettings.from_dsn(settings.REDIS_URL) if settings.REDIS_URL else None
+)
+
+# Requests fall back to BackgroundTasks when Redis is down, so the enqueue
+# side connects once with a short timeout instead of arq's retry loop (the
+# worker keeps the retrying redis_settings)
+_enqueue_redis_settings = (
+    dataclasses.replace(redis_settings, conn_retries=0, conn_timeout=1) if redis_settings else None
+)
+# After a failed connect, don't try Redis again for this long
+_CONNECT_BACKOFF_SECONDS = 30.0
+
+_arq_pool: Optional[ArqRedis] = None
+_retry_connect_at = 0.0
+
+async def get_arq_pool() -> ArqRedis:
+    """Get the shared arq connection pool, creating it on first use."""
+    global _arq_pool, _retry_connect_at
+    if _enqueue_redis_settings is None:
+        raise ConnectionError("REDIS_URL is not set")
+    if _arq_pool is None:
+        if time.monotonic() < _retry_connect_at:
+            raise ConnectionError("Redis unavailable; not retrying until the backoff expires")
+        try:
+            _arq_pool = await create_pool(_enqueue_redis_settings)
+        except Exception:
+            _retry_connect_at = time.monotonic() + _CONNECT_BACKOFF_SECONDS
+            raise
+    return _arq_pool
+
+async def enqueue_job(function: str, *args: Any) -> bool:
+    """Enqueue a job for the arq worker, returning False if Redis is unavailable."""
+    if _enqueue_redis_settings is None:
+        return False
+    try:
+        pool = await get_arq_pool()
+        await pool.enqueue_job(function, *args)
+        return True
+    except Exception as e:
+        logger.warning(f"Failed to enqueue job {function}: {e}")
+        return False
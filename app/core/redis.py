@@ -0,0 +1,28 @@
+import logging
+from typing import Optional
+
+import redis.asyncio as redis
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# One connection pool per process, shared by the response cache, webhook
+# dedup and any route that needs Redis
+redis_pool: Optional[redis.ConnectionPool] = None
+redis_client: Optional[redis.Redis] = None
+if settings.REDIS_URL:
+    try:
+        # Raw bytes: cached payloads are orjson-encoded and stored as-is
+        redis_pool = redis.ConnectionPool.from_url(
+            settings.REDIS_URL,
+            max_connections=settings.REDIS_MAX_CONNECTIONS,
+            decode_responses=False,
+        )
+        redis_client = redis.Redis(connection_pool=redis_pool)
+    except Exception as e:
+        logger.warning(f"Failed to connect to Redis: {e}")
+
+def get_redis() -> Optional[redis.Redis]:
+    """FastAPI dependency for the shared Redis client; None when Redis is disabled"""
+    return redis_client
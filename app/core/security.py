@@ -1,8 +1,12 @@
-from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
 from typing import Any, Dict, Optional, Union
+import asyncio
+import os
+import time
 import uuid # Import uuid for JTI
 
-from jose import jwt
+import jwt
 from passlib.context import CryptContext
 
 from app.core.config import settings
@@ -11,9 +15,20 @@ from app.core.config import settings
 pwd_context = CryptContext(
     schemes=["bcrypt"],
     deprecated="auto",
-    bcrypt__rounds=12  # Higher work factor for better security
+    bcrypt__rounds=settings.BCRYPT_ROUNDS  # Higher work factor for better security
 )
 
+# bcrypt releases the GIL, so hashing runs on its own pool instead of the
+# event loop or the threadpool sync endpoints share
+_hash_executor = ThreadPoolExecutor(
+    max_workers=os.cpu_count() or 1, thread_name_prefix="bcrypt"
+)
+
+# Bound once at import so token creation skips settings lookups
+_SECRET_KEY = settings.SECRET_KEY
+_ALGORITHM = settings.ALGORITHM
+_ACCESS_TOKEN_EXPIRES = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+
 
 def create_access_token(
     subject: Union[str, Any],
@@ -31,24 +46,20 @@ def create_access_token(
     Returns:
         JWT token string
     """
-    if expires_delta:
-        expire = datetime.utcnow() + expires_delta
-    else:
-        expire = datetime.utcnow() + timedelta(
-            minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES
-        )
-    
-    # Base claims with expiration and subject
-    to_encode = {"exp": expire, "sub": str(subject)}
-
-    # Add issued at time for better security
-    to_encode.update({"iat": datetime.utcnow()})
-
-    # Add unique token identifier (JTI) for potential revocation
-    to_encode.update({"jti": str(uuid.uuid4())})
+    # One clock read; exp/iat are NumericDate epoch seconds
+    now = int(time.time())
+    expires = expires_delta or _ACCESS_TOKEN_EXPIRES
 
-    # Add token type to prevent token confusion attacks
-    to_encode.update({"type": "access"})
+    to_encode = {
+        "exp": now + int(expires.total_seconds()),
+        "sub": str(subject),
+        # Add issued at time for better security
+        "iat": now,
+        # Add unique token identifier (JTI) for potential revocation
+        "jti": str(uuid.uuid4()),
+        # Add token type to prevent token confusion attacks
+        "type": "access",
+    }
 
     # Add any additional claims provided
     if additional_claims:
@@ -57,8 +68,8 @@ def create_access_token(
     # Use settings for algorithm and key
     encoded_jwt = jwt.encode(
         to_encode,
-        settings.SECRET_KEY,
-        algorithm=settings.ALGORITHM
+        _SECRET_KEY,
+        algorithm=_ALGORITHM
     )
     return encoded_jwt
 
@@ -71,3 +82,17 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 def get_password_hash(password: str) -> str:
     """Generate a password hash"""
     return pwd_context.hash(password)
+
+
+async def averify_password(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password against a hash without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _hash_executor, pwd_context.verify, plain_password, hashed_password
+    )
+
+
+async def aget_password_hash(password: str) -> str:
+    """Generate a password hash without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_hash_executor, pwd_context.hash, password)
@@ -1,115 +1,152 @@
 from fastapi import FastAPI, Request, status, Depends, HTTPException  # Add HTTPException here
-from fastapi.responses import JSONResponse, RedirectResponse
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import ORJSONResponse, Response
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
 import logging
-from typing import Callable
-from starlette.middleware.base import BaseHTTPMiddleware
+import orjson
+from starlette.datastructures import URL
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 import time
-import uuid
+import secrets
+import structlog
 
 from app.api.routes import api_router
 from app.core.config import settings
 from app.core.limiter import limiter, _rate_limit_exceeded_handler  # Add this import
+from app.core.logging_config import configure_logging
 from slowapi.errors import RateLimitExceeded  # Add this import
 
 # Configure structured logging
-logging.basicConfig(
-    level=getattr(logging, settings.LOG_LEVEL, logging.INFO),
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+configure_logging()
 logger = logging.getLogger(__name__)
 
-# Create custom middleware classes
-class HTTPSRedirectMiddleware(BaseHTTPMiddleware):
+# Create custom middleware classes. These are pure ASGI middlewares: they
+# work on scope/message dicts directly instead of going through
+# BaseHTTPMiddleware's per-request task and Request/Response objects.
+class HTTPSRedirectMiddleware:
     """
     Middleware to redirect HTTP requests to HTTPS in production environments
     """
-    async def dispatch(self, request: Request, call_next: Callable):
-        if (settings.ENVIRONMENT == "production" and
-            request.url.scheme == "http" and
-            request.headers.get("x-forwarded-proto") != "https"):
-            https_url = str(request.url).replace("http://", "https://", 1)
-            return RedirectResponse(https_url, status_code=status.HTTP_301_MOVED_PERMANENTLY)
-        return await call_next(request)
-
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope.get("scheme") != "http":
+            await self.app(scope, receive, send)
+            return
+
+        for name, value in scope["headers"]:
+            if name == b"x-forwarded-proto" and value == b"https":
+                await self.app(scope, receive, send)
+                return
+
+        https_url = str(URL(scope=scope).replace(scheme="https"))
+        await send({
+            "type": "http.response.start",
+            "status": status.HTTP_301_MOVED_PERMANENTLY,
+            "headers": [(b"location", https_url.encode("latin-1")), (b"content-length", b"0")],
+        })
+        await send({"type": "http.response.body", "body": b""})
+
+# Content Security Policy - customize based on your needs
+_CSP_DIRECTIVES = (
+    "default-src 'self'",
+    "img-src 'self' data: https:",
+    "script-src 'self'",
+    "style-src 'self' 'unsafe-inline'",
+    "connect-src 'self'",
+    "frame-ancestors 'none'",
+    "form-action 'self'",
+    "base-uri 'self'",
+)
+
+# Security headers are static, so they are encoded once at import time
+_BASE_SEC_HEADERS = (
+    (b"x-content-type-options", b"nosniff"),
+    (b"x-frame-options", b"DENY"),
+    (b"x-xss-protection", b"1; mode=block"),
+    (b"strict-transport-security", b"max-age=31536000; includeSubDomains"),
+    (b"content-security-policy", "; ".join(_CSP_DIRECTIVES).encode("latin-1")),
+    # Add Referrer-Policy header
+    (b"referrer-policy", b"strict-origin-when-cross-origin"),
+    # Permissions policy (formerly Feature-Policy)
+    (b"permissions-policy", b"geolocation=(), microphone=(), camera=()"),
+)
+# Add cache control for API responses
+_API_SEC_HEADERS = _BASE_SEC_HEADERS + ((b"cache-control", b"no-store, max-age=0"),)
+
+class SecurityHeadersMiddleware:
     """
     Middleware to add security headers to responses
     """
-    async def dispatch(self, request: Request, call_next: Callable):
-        response = await call_next(request)
-        
-        # Add security headers
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["X-Frame-Options"] = "DENY"
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-        response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
-        
-        # Content Security Policy - customize based on your needs
-        csp_directives = [
-            "default-src 'self'",
-            "img-src 'self' data: https:",
-            "script-src 'self'",
-            "style-src 'self' 'unsafe-inline'",
-            "connect-src 'self'",
-            "frame-ancestors 'none'",
-            "form-action 'self'",
-            "base-uri 'self'",
-        ]
-        response.headers["Content-Security-Policy"] = "; ".join(csp_directives)
-        
-        # Add cache control for API responses
-        if request.url.path.startswith("/api/"):
-            response.headers["Cache-Control"] = "no-store, max-age=0"
-        
-        # Add Referrer-Policy header
-        response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
-        
-        # Permissions policy (formerly Feature-Policy)
-        response.headers["Permissions-Policy"] = "geolocation=(), microphone=(), camera=()"
-        
-        return response
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        extra_headers = _API_SEC_HEADERS if scope["path"].startswith("/api/") else _BASE_SEC_HEADERS
 
-class RequestLoggerMiddleware(BaseHTTPMiddleware):
+        async def send_with_headers(message: Message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", ()), *extra_headers]
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+_SLOW_REQUEST_SECONDS = settings.SLOW_REQUEST_THRESHOLD_MS / 1000
+
+class RequestLoggerMiddleware:
     """
-    Middleware to log all requests with timing information
+    Middleware to log requests with timing information
     """
-    async def dispatch(self, request: Request, call_next: Callable):
-        # Generate request ID for tracing
-        request_id = str(uuid.uuid4())
-        request.state.request_id = request_id
-        
-        # Get client info
-        client_host = request.client.host if request.client else "unknown"
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        # Load balancer health probes skip request IDs, timing and logging
+        if scope["type"] != "http" or scope["path"] == "/health":
+            await self.app(scope, receive, send)
+            return
+
+        # Generate request ID for tracing; request.state reads scope["state"]
+        request_id = secrets.token_hex(16)
+        scope.setdefault("state", {})["request_id"] = request_id
+        # Every log record emitted while handling this request carries the ID
+        structlog.contextvars.clear_contextvars()
+        structlog.contextvars.bind_contextvars(request_id=request_id)
         
         # Start timer
-        start_time = time.time()
+        start_time = time.perf_counter()
         
-        # Log the request
-        logger.info(
-            f"Request {request_id}: {request.method} {request.url.path} from {client_host}"
-        )
+        # Per-request logs are DEBUG; the happy path skips formatting entirely
+        if logger.isEnabledFor(logging.DEBUG):
+            client = scope.get("client")
+            logger.debug(
+                "Request %s: %s %s from %s",
+                request_id, scope["method"], scope["path"], client[0] if client else "unknown"
+            )
+
+        status_code = None
+        request_id_header = (b"x-request-id", request_id.encode("latin-1"))
+
+        async def send_with_request_id(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                # Add custom header with request ID
+                message["headers"] = [*message.get("headers", ()), request_id_header]
+            await send(message)
         
         try:
             # Process request
-            response = await call_next(request)
-            
-            # Calculate processing time
-            process_time = time.time() - start_time
-            
-            # Add custom header with request ID
-            response.headers["X-Request-ID"] = request_id
-            
-            # Log response info
-            logger.info(
-                f"Response {request_id}: {response.status_code} completed in {process_time:.3f}s"
-            )
-            
-            return response
+            await self.app(scope, receive, send_with_request_id)
         except Exception as e:
             # Log exception
-            process_time = time.time() - start_time
+            process_time = time.perf_counter() - start_time
             logger.error(
                 f"Request {request_id} failed after {process_time:.3f}s: {str(e)}",
                 exc_info=True
@@ -117,10 +154,23 @@ class RequestLoggerMiddleware(BaseHTTPMiddleware):
             # Let the exception handlers deal with it
             raise
 
+        # Errors and slow responses are logged at INFO, everything else at DEBUG
+        process_time = time.perf_counter() - start_time
+        if (status_code is not None and status_code >= 400) or process_time > _SLOW_REQUEST_SECONDS:
+            logger.info(
+                "Response %s: %s %s %s completed in %.3fs",
+                request_id, scope["method"], scope["path"], status_code, process_time
+            )
+        elif logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "Response %s: %s completed in %.3fs", request_id, status_code, process_time
+            )
+
 app = FastAPI(
     title="E-commerce API",
     description="Backend API for E-commerce Platform",
-    version="0.1.0"
+    version="0.1.0",
+    default_response_class=ORJSONResponse,
 )
 
 # Add the limiter state and handler immediately after app creation
@@ -134,19 +184,18 @@ app.add_middleware(SecurityHeadersMiddleware)
 app.add_middleware(RequestLoggerMiddleware)
 
 # Configure CORS with more restrictive settings
-cors_origins = []
-if settings.CORS_ORIGINS:
-    cors_origins = [origin.strip() for origin in settings.CORS_ORIGINS.split(",")]
-elif settings.ENVIRONMENT != "production":
-    # Allow all origins only in non-production environments if CORS_ORIGINS is not set
-    logger.warning("CORS_ORIGINS not set, allowing all origins for development.")
-    cors_origins = ["*"]
-else:
-    # In production, require CORS_ORIGINS to be explicitly set
-    logger.error("CORS_ORIGINS must be set in production environment!")
-    # Optionally raise an error or default to a very restrictive setting:
-    # raise ValueError("CORS_ORIGINS must be set in production environment!")
-    cors_origins = [] # Default to no origins allowed if not set in production
+cors_origins = settings.CORS_ORIGINS
+if not cors_origins:
+    if settings.ENVIRONMENT != "production":
+        # Allow all origins only in non-production environments if CORS_ORIGINS is not set
+        logger.warning("CORS_ORIGINS not set, allowing all origins for development.")
+        cors_origins = ["*"]
+    else:
+        # In production, require CORS_ORIGINS to be explicitly set
+        logger.error("CORS_ORIGINS must be set in production environment!")
+        # Optionally raise an error or default to a very restrictive setting:
+        # raise ValueError("CORS_ORIGINS must be set in production environment!")
+        cors_origins = [] # Default to no origins allowed if not set in production
 
 app.add_middleware(
     CORSMiddleware,
@@ -161,10 +210,9 @@ app.add_middleware(
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request: Request, exc: HTTPException):
     logger.warning(
-        f"HTTP {exc.status_code} - {request.method} {request.url.path} - {exc.detail}",
-        extra={"request_id": getattr(request.state, "request_id", "unknown")}
+        f"HTTP {exc.status_code} - {request.method} {request.url.path} - {exc.detail}"
     )
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=exc.status_code,
         content={"detail": exc.detail},
         headers=getattr(exc, "headers", None),
@@ -185,15 +233,13 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
     
     logger.warning(
         f"Validation error: {request.method} {request.url.path}",
-        extra={
-            "request_id": getattr(request.state, "request_id", "unknown"),
-            "errors": sanitized_errors
-        }
+        extra={"errors": sanitized_errors}
     )
     
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-        content={"detail": exc.errors()},
+        # errors() can carry exception objects in "ctx", which orjson rejects
+        content={"detail": jsonable_encoder(exc.errors())},
     )
 
 @app.exception_handler(Exception)
@@ -201,11 +247,10 @@ async def generic_exception_handler(request: Request, exc: Exception):
     # Log unhandled exceptions but don't expose details to client
     logger.error(
         f"Unhandled exception in {request.method} {request.url.path}: {type(exc).__name__}",
-        exc_info=True,
-        extra={"request_id": getattr(request.state, "request_id", "unknown")}
+        exc_info=True
     )
     
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
         content={"detail": "An internal server error occurred."},
     )
@@ -213,16 +258,22 @@ async def generic_exception_handler(request: Request, exc: Exception):
 
 app.include_router(api_router, prefix="/api")
 
+# Both bodies are constant, so they're encoded once instead of per request
+_ROOT_BODY = orjson.dumps({
+    "message": "Welcome to the E-commerce API",
+    "docs": "/docs",
+    "version": app.version
+})
+_HEALTH_BODY = orjson.dumps({"status": "healthy"})
+
 @app.get("/")
 async def root():
     """Root endpoint with API information"""
-    return {
-        "message": "Welcome to the E-commerce API",
-        "docs": "/docs",
-        "version": app.version
-    }
+    return Response(
+        _ROOT_BODY, media_type="application/json", headers={"cache-control": "public, max-age=300"}
+    )
 
 @app.get("/health")
 async def health_check():
     """Health check endpoint for monitoring"""
-    return {"status": "healthy"}
+    return Response(_HEALTH_BODY, media_type="application/json", headers={"cache-control": "no-cache"})
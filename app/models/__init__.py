@@ -2,3 +2,5 @@ from app.models.user import User
 from app.models.product import Product
 from app.models.cart import Cart, CartItem
 from app.models.order import Order, OrderItem, OrderStatus
+from app.models.stripe_event import StripeEvent
+from app.models.outbox import Outbox
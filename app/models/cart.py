@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, ForeignKey, Float, DateTime
+from sqlalchemy import Column, Integer, ForeignKey, Float, DateTime, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
@@ -15,7 +15,15 @@ class Cart(Base):
 
     # Relationships
     user = relationship("User", backref="cart")
-    items = relationship("CartItem", back_populates="cart", cascade="all, delete-orphan")
+    # cart_items.cart_id is ON DELETE CASCADE, so let the database remove items
+    items = relationship(
+        "CartItem", back_populates="cart", cascade="all, delete-orphan", passive_deletes=True
+    )
+
+    # Every cart endpoint looks the cart up by user; one cart per user
+    __table_args__ = (
+        Index("ix_carts_user", user_id, unique=True),
+    )
     
 
 class CartItem(Base):
@@ -30,3 +38,8 @@ class CartItem(Base):
     # Relationships
     cart = relationship("Cart", back_populates="items")
     product = relationship("Product")
+
+    # Lookup of an existing line when adding a product to the cart
+    __table_args__ = (
+        Index("ix_cartitems_cart_product", cart_id, product_id, unique=True),
+    )
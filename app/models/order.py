@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, ForeignKey, Float, String, DateTime, Enum
+from sqlalchemy import Column, Integer, ForeignKey, Float, String, DateTime, Enum, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import enum
@@ -13,6 +13,7 @@ class OrderStatus(str, enum.Enum):
     SHIPPED = "shipped"
     DELIVERED = "delivered"
     CANCELLED = "cancelled"
+    FAILED = "failed"
 
 
 class Order(Base):
@@ -26,17 +27,26 @@ class Order(Base):
     payment_id = Column(String)  # For storing Stripe payment ID
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    version_id = Column(Integer, nullable=False, default=1)  # Optimistic locking
 
     # Relationships
     user = relationship("User", backref="orders")
     items = relationship("OrderItem", back_populates="order", cascade="all, delete-orphan")
 
+    # Per-user order history and admin/analytics listings by status
+    __table_args__ = (
+        Index("ix_orders_user_created", user_id, created_at.desc()),
+        Index("ix_orders_status_created", status, created_at),
+    )
+    # Concurrent read-modify-write (e.g. duplicate webhooks) raises StaleDataError
+    __mapper_args__ = {"version_id_col": version_id}
+
 
 class OrderItem(Base):
     __tablename__ = "order_items"
 
     id = Column(Integer, primary_key=True, index=True)
-    order_id = Column(Integer, ForeignKey("orders.id", ondelete="CASCADE"), nullable=False)
+    order_id = Column(Integer, ForeignKey("orders.id", ondelete="CASCADE"), nullable=False, index=True)
     product_id = Column(Integer, ForeignKey("products.id", ondelete="SET NULL"), nullable=True)
     product_name = Column(String, nullable=False)  # Store name in case product is deleted
     quantity = Column(Integer, nullable=False)
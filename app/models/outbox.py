@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, JSON
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.sql import func
+
+from app.core.database import Base
+
+
+class Outbox(Base):
+    """Side effects (e.g. emails) written in the same transaction as the data they describe"""
+    __tablename__ = "outbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String, nullable=False)
+    payload = Column(JSON().with_variant(JSONB(), "postgresql"), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Failed deliveries so far and why the last one failed; rows that reach
+    # the dispatcher's attempt limit stay here for inspection
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    last_error = Column(Text)
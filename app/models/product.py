@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, Float, Boolean, Text, DateTime
+from sqlalchemy import Column, String, Integer, Float, Boolean, Text, DateTime, Index
 from sqlalchemy.sql import func
 
 from app.core.database import Base
@@ -18,3 +18,20 @@ class Product(Base):
     sku = Column(String, unique=True, index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    version_id = Column(Integer, nullable=False, default=1)  # Optimistic locking
+
+    __mapper_args__ = {"version_id_col": version_id}
+
+    # Backs get_products' category/price filters over active products. The
+    # PostgreSQL pg_trgm GIN indexes on name/description used by the ILIKE
+    # search are created in the migration only, since they have no SQLite
+    # equivalent.
+    __table_args__ = (
+        Index(
+            "ix_products_active_category_price",
+            category,
+            price,
+            postgresql_where=is_active,
+            sqlite_where=is_active,
+        ),
+    )
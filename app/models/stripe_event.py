@@ -0,0 +1,12 @@
+from sqlalchemy import Column, String, DateTime
+from sqlalchemy.sql import func
+
+from app.core.database import Base
+
+
+class StripeEvent(Base):
+    """Stripe webhook events that have already been handled"""
+    __tablename__ = "stripe_events"
+
+    event_id = Column(String, primary_key=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
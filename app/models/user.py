@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, String, Integer, DateTime
+from sqlalchemy import Boolean, Column, String, Integer, DateTime, Index
 from sqlalchemy.sql import func
 
 from app.core.database import Base
@@ -16,3 +16,8 @@ class User(Base):
     is_admin = Column(Boolean, default=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    # Case-insensitive username lookups (emails are stored lowercased)
+    __table_args__ = (
+        Index("ix_users_username_lower", func.lower(username)),
+    )
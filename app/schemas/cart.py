@@ -1,6 +1,6 @@
 from typing import List, Optional
 from datetime import datetime
-from pydantic import BaseModel, validator
+from pydantic import BaseModel, ConfigDict, field_validator
 
 from app.schemas.product import Product
 
@@ -10,7 +10,8 @@ class CartItemBase(BaseModel):
     product_id: int
     quantity: int
     
-    @validator('quantity')
+    @field_validator('quantity')
+    @classmethod
     def quantity_must_be_positive(cls, v):
         if v <= 0:
             raise ValueError('Quantity must be positive')
@@ -24,7 +25,8 @@ class CartItemCreate(CartItemBase):
 class CartItemUpdate(BaseModel):
     quantity: int
     
-    @validator('quantity')
+    @field_validator('quantity')
+    @classmethod
     def quantity_must_be_positive(cls, v):
         if v <= 0:
             raise ValueError('Quantity must be positive')
@@ -36,8 +38,7 @@ class CartItemInDBBase(CartItemBase):
     cart_id: int
     unit_price: float
     
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class CartItemInDB(CartItemInDBBase):
@@ -62,8 +63,7 @@ class CartInDBBase(CartBase):
     created_at: datetime
     updated_at: Optional[datetime] = None
     
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class Cart(CartInDBBase):
@@ -1,6 +1,6 @@
 from typing import List, Optional
 from datetime import datetime
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 
 from app.models.order import OrderStatus
 
@@ -21,8 +21,7 @@ class OrderItemInDBBase(OrderItemBase):
     order_id: int
     product_name: str
     
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class OrderItem(OrderItemInDBBase):
@@ -52,8 +51,7 @@ class OrderInDBBase(OrderBase):
     created_at: datetime
     updated_at: Optional[datetime] = None
     
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class Order(OrderInDBBase):
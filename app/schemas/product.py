@@ -1,6 +1,6 @@
 from typing import Optional
 from datetime import datetime
-from pydantic import BaseModel, validator
+from pydantic import BaseModel, ConfigDict, field_validator
 
 
 # Shared properties
@@ -22,13 +22,15 @@ class ProductCreate(ProductBase):
     stock: int
     sku: str
     
-    @validator('price')
+    @field_validator('price')
+    @classmethod
     def price_must_be_positive(cls, v):
         if v <= 0:
             raise ValueError('Price must be positive')
         return v
     
-    @validator('stock')
+    @field_validator('stock')
+    @classmethod
     def stock_must_be_non_negative(cls, v):
         if v < 0:
             raise ValueError('Stock cannot be negative')
@@ -49,8 +51,7 @@ class ProductInDBBase(ProductBase):
     created_at: datetime
     updated_at: Optional[datetime] = None
     
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 # Properties to return via API
@@ -1,6 +1,6 @@
 from typing import Optional
 from datetime import datetime
-from pydantic import BaseModel, EmailStr, validator
+from pydantic import BaseModel, ConfigDict, EmailStr, field_validator
 
 
 # Shared properties
@@ -18,7 +18,8 @@ class UserCreate(UserBase):
     username: str
     password: str
 
-    @validator('username')
+    @field_validator('username')
+    @classmethod
     def username_alphanumeric(cls, v):
         assert v.isalnum(), 'Username must be alphanumeric'
         return v
@@ -29,14 +30,19 @@ class UserUpdate(UserBase):
     password: Optional[str] = None
 
 
+# Account status fields only an admin may change
+class UserStatusUpdate(BaseModel):
+    is_active: Optional[bool] = None
+    is_admin: Optional[bool] = None
+
+
 # Properties to return via API
 class UserInDBBase(UserBase):
     id: int
     created_at: datetime
     updated_at: Optional[datetime] = None
     
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 # Additional properties stored in DB
@@ -1,13 +1,67 @@
+import asyncio
 import smtplib
+from functools import lru_cache
 import logging
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from typing import List, Dict, Any, Optional
 
+from jinja2 import Environment
+
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Parsed and compiled once; autoescape keeps product names and addresses
+# from injecting markup into the email
+_ORDER_CONFIRMATION_TEMPLATE = Environment(autoescape=True).from_string("""
+        <html>
+            <head>
+                <style>
+                    body { font-family: Arial, sans-serif; }
+                    .order-details { border: 1px solid #ddd; padding: 15px; }
+                    .items { width: 100%; border-collapse: collapse; }
+                    .items th, .items td { border: 1px solid #ddd; padding: 8px; text-align: left; }
+                    .footer { margin-top: 20px; font-size: 12px; color: #666; }
+                </style>
+            </head>
+            <body>
+                <h1>Thank you for your order!</h1>
+                <p>We've received your order and are processing it now.</p>
+                
+                <div class="order-details">
+                    <h2>Order #{{ order.id }}</h2>
+                    <p><strong>Date:</strong> {{ order.created_at }}</p>
+                    <p><strong>Status:</strong> {{ order.status }}</p>
+                    <p><strong>Total:</strong> ${{ "%.2f"|format(order.total_amount) }}</p>
+                    
+                    <h3>Items:</h3>
+                    <table class="items">
+                        <tr>
+                            <th>Product</th>
+                            <th>Quantity</th>
+                            <th>Price</th>
+                        </tr>
+                        {% for item in items %}
+                        <tr>
+                            <td>{{ item.product_name }}</td>
+                            <td>{{ item.quantity }}</td>
+                            <td>${{ "%.2f"|format(item.unit_price) }}</td>
+                        </tr>
+                        {% endfor %}
+                    </table>
+                    
+                    <h3>Shipping Address:</h3>
+                    <p>{{ order.shipping_address }}</p>
+                </div>
+                
+                <div class="footer">
+                    <p>If you have any questions, please contact our customer support.</p>
+                </div>
+            </body>
+        </html>
+""")
+
 class EmailService:
     """
     Service for sending email notifications.
@@ -23,6 +77,47 @@ class EmailService:
         self.smtp_password = settings.SMTP_PASSWORD
         self.from_email = settings.FROM_EMAIL
         self.enabled = settings.EMAIL_ENABLED
+        # One SMTP connection reused across sends; smtplib is blocking, so
+        # it's only touched from the executor while holding the lock
+        self._smtp: Optional[smtplib.SMTP] = None
+        self._lock = asyncio.Lock()
+
+    def _connect(self) -> smtplib.SMTP:
+        """Open and authenticate a new SMTP connection"""
+        server = smtplib.SMTP(self.smtp_server, self.smtp_port, timeout=30)
+        if self.smtp_user and self.smtp_password:
+            server.login(self.smtp_user, self.smtp_password)
+        return server
+
+    def _close_sync(self) -> None:
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except smtplib.SMTPException:
+                self._smtp.close()
+            except OSError:
+                pass
+            self._smtp = None
+
+    def _send_sync(self, to_email: str, message: str) -> None:
+        """Send over the pooled connection, reconnecting once if it was dropped"""
+        if self._smtp is None:
+            self._smtp = self._connect()
+        try:
+            self._smtp.sendmail(self.from_email, [to_email], message)
+        except smtplib.SMTPServerDisconnected:
+            # Idle connections get closed by the server; retry on a fresh one
+            self._smtp = self._connect()
+            self._smtp.sendmail(self.from_email, [to_email], message)
+        except Exception:
+            # Connection state is unknown after other failures; start over next time
+            self._close_sync()
+            raise
+
+    async def close(self) -> None:
+        """Close the pooled SMTP connection"""
+        async with self._lock:
+            await asyncio.get_running_loop().run_in_executor(None, self._close_sync)
 
     async def send_email(
         self, 
@@ -54,14 +149,11 @@ class EmailService:
             message.attach(part1)
             message.attach(part2)
             
-            # Connect to server and send
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                if self.smtp_user and self.smtp_password:
-                    server.login(self.smtp_user, self.smtp_password)
-                server.sendmail(
-                    self.from_email,
-                    [to_email],
-                    message.as_string()
+            # Send over the shared connection without blocking the event loop
+            message_str = message.as_string()
+            async with self._lock:
+                await asyncio.get_running_loop().run_in_executor(
+                    None, self._send_sync, to_email, message_str
                 )
             
             logger.info(f"Email sent successfully to {to_email}")
@@ -81,61 +173,13 @@ class EmailService:
         """
         subject = f"Order Confirmation #{order_details['id']}"
         
-        # Build HTML content
-        html_content = f"""
-        <html>
-            <head>
-                <style>
-                    body {{ font-family: Arial, sans-serif; }}
-                    .order-details {{ border: 1px solid #ddd; padding: 15px; }}
-                    .items {{ width: 100%; border-collapse: collapse; }}
-                    .items th, .items td {{ border: 1px solid #ddd; padding: 8px; text-align: left; }}
-                    .footer {{ margin-top: 20px; font-size: 12px; color: #666; }}
-                </style>
-            </head>
-            <body>
-                <h1>Thank you for your order!</h1>
-                <p>We've received your order and are processing it now.</p>
-                
-                <div class="order-details">
-                    <h2>Order #{order_details['id']}</h2>
-                    <p><strong>Date:</strong> {order_details['created_at']}</p>
-                    <p><strong>Status:</strong> {order_details['status']}</p>
-                    <p><strong>Total:</strong> ${order_details['total_amount']:.2f}</p>
-                    
-                    <h3>Items:</h3>
-                    <table class="items">
-                        <tr>
-                            <th>Product</th>
-                            <th>Quantity</th>
-                            <th>Price</th>
-                        </tr>
-        """
-        
-        # Add items to the email
-        for item in order_details['items']:
-            html_content += f"""
-                <tr>
-                    <td>{item['product_name']}</td>
-                    <td>{item['quantity']}</td>
-                    <td>${item['unit_price']:.2f}</td>
-                </tr>
-            """
-            
-        html_content += f"""
-                    </table>
-                    
-                    <h3>Shipping Address:</h3>
-                    <p>{order_details['shipping_address']}</p>
-                </div>
-                
-                <div class="footer">
-                    <p>If you have any questions, please contact our customer support.</p>
-                </div>
-            </body>
-        </html>
-        """
+        html_content = _ORDER_CONFIRMATION_TEMPLATE.render(
+            order=order_details, items=order_details['items']
+        )
         
         return await self.send_email(to_email, subject, html_content)
 
-email_service = EmailService()
+@lru_cache(maxsize=1)
+def get_email_service() -> EmailService:
+    """Shared EmailService, created on first use rather than at import"""
+    return EmailService()
@@ -0,0 +1,86 @@
+import logging
+
+from sqlalchemy import case, select, update
+from sqlalchemy.orm import selectinload
+
+from app.core.database import AsyncSessionLocal
+from app.models.order import Order, OrderStatus
+from app.models.product import Product
+
+logger = logging.getLogger(__name__)
+
+
+async def process_order_after_payment(order_id: int) -> None:
+    """
+    Update product stock after successful payment.
+
+    Runs in the worker (or as a fallback background task) and always opens
+    its own session, never reusing one from a request. The order moves
+    PAID -> PROCESSING in the same transaction as the stock decrement, so a
+    retried or duplicate job finds it no longer PAID and does nothing.
+    """
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(Order).options(selectinload(Order.items)).where(Order.id == order_id)
+        )
+        order = result.scalar_one_or_none()
+        if not order or order.status != OrderStatus.PAID:
+            # Log if order not found or status incorrect for processing
+            logger.warning(f"Order {order_id} not found or not in PAID status for stock update.")
+            return
+
+        # Aggregate quantities per product so each product is updated once
+        quantities = {}
+        for item in order.items:
+            if item.product_id:
+                quantities[item.product_id] = quantities.get(item.product_id, 0) + item.quantity
+
+        try:
+            # Claim the order first; a concurrent run blocks on the row lock
+            # and then matches nothing
+            if not await _transition_from_paid(db, order_id, OrderStatus.PROCESSING):
+                await db.rollback()
+                logger.info(f"Order {order_id} was already processed; skipping stock update.")
+                return
+
+            if quantities:
+                # One conditional UPDATE for every product. The stock >= qty guard prevents
+                # overselling and RETURNING tells us exactly which rows were decremented.
+                qty = case(quantities, value=Product.id)
+                stmt = (
+                    update(Product)
+                    .where(Product.id.in_(list(quantities)), Product.stock >= qty)
+                    .values(stock=Product.stock - qty, version_id=Product.version_id + 1)
+                    .returning(Product.id)
+                    .execution_options(synchronize_session=False)
+                )
+                updated_ids = set((await db.execute(stmt)).scalars().all())
+                missing = set(quantities) - updated_ids
+                if missing:
+                    # All-or-nothing: undo the claim and partial decrement, then fail the order
+                    await db.rollback()
+                    logger.error(
+                        f"Insufficient stock for products {sorted(missing)} during order {order_id} processing."
+                    )
+                    if await _transition_from_paid(db, order_id, OrderStatus.FAILED):
+                        await db.commit()
+                    else:
+                        await db.rollback()
+                    return
+
+            await db.commit()
+            logger.info(f"Successfully updated stock for order {order_id}")
+        except Exception as e:
+            logger.error(f"Error committing stock updates for order {order_id}: {e}")
+            await db.rollback()
+
+
+async def _transition_from_paid(db, order_id: int, status: OrderStatus) -> bool:
+    """Move an order out of PAID; False if it had already left PAID"""
+    result = await db.execute(
+        update(Order)
+        .where(Order.id == order_id, Order.status == OrderStatus.PAID)
+        .values(status=status, version_id=Order.version_id + 1)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
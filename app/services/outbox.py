@@ -0,0 +1,84 @@
+import asyncio
+import logging
+from typing import Tuple
+
+from sqlalchemy import delete, select
+
+from app.core.database import AsyncSessionLocal
+from app.models.outbox import Outbox
+from app.services.notifications import get_email_service
+
+logger = logging.getLogger(__name__)
+
+ORDER_CONFIRMATION = "order_confirmation"
+
+# Rows that have failed this many times are parked: no longer polled, but
+# kept with their last error for someone to inspect and requeue
+MAX_ATTEMPTS = 10
+
+
+async def dispatch_order_confirmations(batch_size: int = 10) -> int:
+    """
+    Send pending order confirmation emails from the outbox.
+
+    Works through the backlog in small batches, each its own transaction, so
+    row locks are only held for a few sends at a time. Sent rows are deleted;
+    failed ones record the attempt and error and are retried on a later poll
+    until MAX_ATTEMPTS. Returns the number of emails sent.
+    """
+    sent = 0
+    while True:
+        claimed, batch_sent = await _dispatch_batch(batch_size)
+        sent += batch_sent
+        # A short batch means the backlog is drained (or the rest is locked
+        # by another worker); failures wait for the next poll
+        if claimed < batch_size or batch_sent < claimed:
+            return sent
+
+
+async def _dispatch_batch(batch_size: int) -> Tuple[int, int]:
+    """
+    Claim and send one batch; returns (rows claimed, emails sent).
+
+    Rows are claimed with FOR UPDATE SKIP LOCKED so several workers can poll
+    concurrently, and stay locked while EmailService sends them one at a time.
+    """
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(Outbox)
+            .where(Outbox.kind == ORDER_CONFIRMATION, Outbox.attempts < MAX_ATTEMPTS)
+            .order_by(Outbox.id)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        rows = result.scalars().all()
+        if not rows:
+            return 0, 0
+
+        email_service = get_email_service()
+        results = await asyncio.gather(
+            *(
+                email_service.send_order_confirmation(row.payload["to_email"], row.payload["order"])
+                for row in rows
+            ),
+            return_exceptions=True,
+        )
+
+        sent_ids = []
+        for row, outcome in zip(rows, results):
+            if outcome is True:
+                sent_ids.append(row.id)
+                continue
+            row.attempts += 1
+            row.last_error = repr(outcome) if isinstance(outcome, BaseException) else "Email send failed"
+            if row.attempts >= MAX_ATTEMPTS:
+                logger.error(
+                    f"Outbox row {row.id} failed {row.attempts} times and was parked: {row.last_error}"
+                )
+        if len(sent_ids) < len(rows):
+            logger.warning(f"{len(rows) - len(sent_ids)} order confirmation(s) failed to send")
+
+        if sent_ids:
+            await db.execute(delete(Outbox).where(Outbox.id.in_(sent_ids)))
+        await db.commit()
+        return len(rows), len(sent_ids)
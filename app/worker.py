@@ -0,0 +1,36 @@
+"""
+arq worker for post-response order processing.
+
+Run with: arq app.worker.WorkerSettings
+"""
+from arq import cron
+
+from app.core.queue import redis_settings
+from app.services.notifications import get_email_service
+from app.services.orders import process_order_after_payment
+from app.services.outbox import dispatch_order_confirmations
+
+
+async def process_paid_order(ctx, order_id: int) -> None:
+    """Decrement stock for an order that has been paid"""
+    await process_order_after_payment(order_id)
+
+
+async def send_order_confirmations(ctx) -> int:
+    """Poll the outbox and send pending order confirmation emails"""
+    return await dispatch_order_confirmations()
+
+
+async def shutdown(ctx) -> None:
+    """Close the worker's pooled SMTP connection"""
+    await get_email_service().close()
+
+
+class WorkerSettings:
+    functions = [process_paid_order]
+    cron_jobs = [
+        # Every 5 seconds; arq skips a run if the previous one is still going
+        cron(send_order_confirmations, second=set(range(0, 60, 5)), unique=True),
+    ]
+    on_shutdown = shutdown
+    redis_settings = redis_settings
@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+"""
+bcrypt cost calibration for e-commerce-backend
+
+Times password hashing at increasing work factors on this machine and
+suggests the highest BCRYPT_ROUNDS value that stays within a target
+latency per hash.
+"""
+import argparse
+import time
+
+from passlib.context import CryptContext
+
+def parse_args():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Pick a bcrypt work factor for BCRYPT_ROUNDS")
+    parser.add_argument("--target-ms", type=float, default=250.0, help="Maximum time per hash in milliseconds")
+    parser.add_argument("--min-rounds", type=int, default=10, help="Lowest work factor to try")
+    parser.add_argument("--max-rounds", type=int, default=16, help="Highest work factor to try")
+    parser.add_argument("--samples", type=int, default=3, help="Hashes timed per work factor")
+    return parser.parse_args()
+
+def time_rounds(rounds: int, samples: int) -> float:
+    """Return the median time in milliseconds to hash a password at this cost"""
+    context = CryptContext(schemes=["bcrypt"], bcrypt__rounds=rounds)
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        context.hash("calibration-password")
+        timings.append((time.perf_counter() - start) * 1000)
+    return sorted(timings)[len(timings) // 2]
+
+def main():
+    args = parse_args()
+    chosen = None
+    for rounds in range(args.min_rounds, args.max_rounds + 1):
+        elapsed = time_rounds(rounds, args.samples)
+        print(f"rounds={rounds:2d}  {elapsed:8.1f} ms")
+        if elapsed > args.target_ms:
+            break
+        chosen = rounds
+
+    if chosen is None:
+        print(f"\nEven {args.min_rounds} rounds exceeds {args.target_ms:.0f} ms; check the host's CPU.")
+    else:
+        print(f"\nSuggested: BCRYPT_ROUNDS={chosen}")
+
+if __name__ == "__main__":
+    main()
@@ -6,126 +6,182 @@ python setup_local.py
 """
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 # Ensure the script can import from the app package
 current_dir = Path(__file__).resolve().parent
 sys.path.append(str(current_dir))
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, insert, inspect, select
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 from app.core.config import settings
 from app.core.security import get_password_hash
 from app.models.user import User
 from app.models.product import Product
 from app.core.database import Base
 
-# Security warning
-print("WARNING: This script creates users with preset passwords for DEVELOPMENT USE ONLY.")
-print("         Never use these credentials in a production environment!")
-print("=" * 80)
-
-# Check if running in a production environment
-if os.getenv("ENVIRONMENT", "").lower() == "production":
-    print("ERROR: This script should not be run in production environments!")
-    sys.exit(1)
-
-# Improve error handling for database operations
-try:
-    # Create engine for database (moved inside try block)
-    if settings.DATABASE_URL.startswith("sqlite"):
-        engine = create_engine(
-            settings.DATABASE_URL, connect_args={"check_same_thread": False}
-        )
-    else:
-        engine = create_engine(settings.DATABASE_URL)
-
-    # Create tables
-    Base.metadata.create_all(bind=engine)
-
-    # Create session
-    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-    db = SessionLocal()
-
-    # Check if any users already exist
-    existing_user = db.query(User).first()
-
-    if not existing_user:
-        print("Creating test users...")
-        # Create admin user
-        admin_user = User(
-            email="admin@example.com",
-            username="admin",
-            hashed_password=get_password_hash("admin123"),
-            full_name="Admin User",
-            is_active=True,
-            is_admin=True,
-        )
-        db.add(admin_user)
-
-        # Create regular user
-        regular_user = User(
-            email="user@example.com",
-            username="user",
-            hashed_password=get_password_hash("user123"),
-            full_name="Regular User",
-            is_active=True,
-            is_admin=False,
+# Development users and products. Seeding is idempotent per row: re-runs
+# only add entries whose email or SKU isn't in the database yet
+SEED_USERS = [
+    dict(
+        email="admin@example.com",
+        username="admin",
+        full_name="Admin User",
+        is_admin=True,
+    ),
+    dict(
+        email="user@example.com",
+        username="user",
+        full_name="Regular User",
+        is_admin=False,
+    ),
+]
+SEED_PASSWORDS = {"admin@example.com": "admin123", "user@example.com": "user123"}
+
+SEED_PRODUCTS = [
+    dict(
+        name="Laptop",
+        description="Powerful laptop with high performance",
+        price=999.99,
+        image_url="https://example.com/laptop.jpg",
+        stock=10,
+        category="Electronics",
+        sku="TECH-001",
+    ),
+    dict(
+        name="Smartphone",
+        description="Latest smartphone with amazing camera",
+        price=499.99,
+        image_url="https://example.com/smartphone.jpg",
+        stock=20,
+        category="Electronics",
+        sku="TECH-002",
+    ),
+    dict(
+        name="Headphones",
+        description="Noise cancelling wireless headphones",
+        price=149.99,
+        image_url="https://example.com/headphones.jpg",
+        stock=30,
+        category="Audio",
+        sku="AUDIO-001",
+    ),
+    dict(
+        name="Coffee Maker",
+        description="Automatic coffee maker for your kitchen",
+        price=79.99,
+        image_url="https://example.com/coffeemaker.jpg",
+        stock=15,
+        category="Home",
+        sku="HOME-001",
+    ),
+]
+
+# Dialects whose INSERT can skip rows that hit a unique constraint
+_CONFLICT_INSERTS = {"postgresql": postgresql_insert, "sqlite": sqlite_insert}
+
+def insert_missing(db, model, rows, key):
+    """Insert the rows not already in the table in one statement; returns the new rows' ids"""
+    dialect = db.get_bind().dialect
+    dialect_insert = _CONFLICT_INSERTS.get(dialect.name)
+    if dialect_insert is not None and dialect.insert_returning:
+        stmt = dialect_insert(model).values(rows).on_conflict_do_nothing().returning(model.id)
+        return db.scalars(stmt).all()
+    # Elsewhere (or SQLite before 3.35, without RETURNING), leave out the keys
+    # already present, then look the new rows' ids up by key
+    column = getattr(model, key)
+    present = set(db.scalars(select(column).where(column.in_([row[key] for row in rows]))))
+    rows = [row for row in rows if row[key] not in present]
+    if not rows:
+        return []
+    db.execute(insert(model).values(rows))
+    return db.scalars(select(model.id).where(column.in_([row[key] for row in rows]))).all()
+
+def seed_users(db):
+    """Add the seed users that are missing; returns the new users' ids"""
+    # Hash passwords only for seed users that aren't there yet, so a re-run
+    # pays no KDF cost. bcrypt releases the GIL, so the hashes run in parallel
+    present = set(db.scalars(
+        select(User.email).where(User.email.in_([user["email"] for user in SEED_USERS]))
+    ))
+    new_users = [user for user in SEED_USERS if user["email"] not in present]
+    if not new_users:
+        return []
+    with ThreadPoolExecutor(max_workers=len(new_users)) as executor:
+        hashes = executor.map(
+            get_password_hash, [SEED_PASSWORDS[user["email"]] for user in new_users]
         )
-        db.add(regular_user)
-        db.commit()
-        print("Test users created.")
-
-    # Check if any products already exist
-    existing_product = db.query(Product).first()
-
-    if not existing_product:
-        print("Creating test products...")
-        # Create some test products
-        products = [
-            Product(
-                name="Laptop",
-                description="Powerful laptop with high performance",
-                price=999.99,
-                image_url="https://example.com/laptop.jpg",
-                stock=10,
-                category="Electronics",
-                sku="TECH-001",
-            ),
-            Product(
-                name="Smartphone",
-                description="Latest smartphone with amazing camera",
-                price=499.99,
-                image_url="https://example.com/smartphone.jpg",
-                stock=20,
-                category="Electronics",
-                sku="TECH-002",
-            ),
-            Product(
-                name="Headphones",
-                description="Noise cancelling wireless headphones",
-                price=149.99,
-                image_url="https://example.com/headphones.jpg",
-                stock=30,
-                category="Audio",
-                sku="AUDIO-001",
-            ),
-            Product(
-                name="Coffee Maker",
-                description="Automatic coffee maker for your kitchen",
-                price=79.99,
-                image_url="https://example.com/coffeemaker.jpg",
-                stock=15,
-                category="Home",
-                sku="HOME-001",
-            ),
+    rows = [dict(user, hashed_password=hashed) for user, hashed in zip(new_users, hashes)]
+    return insert_missing(db, User, rows, 'email')
+
+def seed_products(db):
+    """Add the seed products that are missing; returns the new products' ids"""
+    return insert_missing(db, Product, SEED_PRODUCTS, 'sku')
+
+def _sqlite_pragmas(dbapi_connection, _connection_record):
+    """Tune each SQLite connection for the seeding run"""
+    # WAL commits append to the log instead of rewriting the database, and
+    # NORMAL syncs at checkpoints rather than on every commit; both are safe
+    # for a re-runnable dev seed
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+def main():
+    # Security warning
+    print("WARNING: This script creates users with preset passwords for DEVELOPMENT USE ONLY.")
+    print("         Never use these credentials in a production environment!")
+    print("=" * 80)
+
+    # Check if running in a production environment
+    if os.getenv("ENVIRONMENT", "").lower() == "production":
+        print("ERROR: This script should not be run in production environments!")
+        return 1
+
+    # Improve error handling for database operations
+    try:
+        # Create engine for database (moved inside try block)
+        if settings.DATABASE_URL.startswith("sqlite"):
+            # The script is single-threaded; one connection serves table
+            # creation and seeding alike
+            engine = create_engine(
+                settings.DATABASE_URL,
+                connect_args={"check_same_thread": False},
+                poolclass=StaticPool,
+            )
+            event.listen(engine, "connect", _sqlite_pragmas)
+        else:
+            engine = create_engine(settings.DATABASE_URL)
+
+        # Create missing tables. One catalog listing replaces create_all's
+        # per-table existence probe, and re-runs usually find nothing to create
+        existing_tables = set(inspect(engine).get_table_names())
+        missing_tables = [
+            table for name, table in Base.metadata.tables.items() if name not in existing_tables
         ]
-        for product in products:
-            db.add(product)
-        db.commit()
-        print("Test products created.")
-
-    print("Local setup completed successfully!")
-except Exception as e:
-    print(f"ERROR: Setup failed: {e}")
-    sys.exit(1)
+        if missing_tables:
+            Base.metadata.create_all(bind=engine, tables=missing_tables, checkfirst=False)
+
+        # Create session. Users and products are seeded in one transaction, so
+        # there is a single COMMIT and a failure rolls both back
+        SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        with SessionLocal.begin() as db:
+            user_ids = seed_users(db)
+            if user_ids:
+                print(f"Created {len(user_ids)} test users.")
+            product_ids = seed_products(db)
+            print(f"Created {len(product_ids)} test products.")
+
+        print("Local setup completed successfully!")
+    except Exception as e:
+        print(f"ERROR: Setup failed: {e}")
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main() or 0)
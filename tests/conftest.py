@@ -1,17 +1,49 @@
+import os
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+
+# Minimum bcrypt cost so fixtures that hash passwords stay fast; must be set
+# before app.core.config builds its settings
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+# Settings the app can't import without, and no Redis so caching, rate
+# limiting and the job queue use their in-process fallbacks
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
+# The SQLite file lives outside the repo so runs leave nothing behind
+_TEST_DB_DIR = tempfile.mkdtemp(prefix="ecommerce-tests-")
+_TEST_DB_PATH = os.path.join(_TEST_DB_DIR, "test.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_TEST_DB_PATH}")
+os.environ.setdefault("REDIS_URL", "")
+
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import NullPool, StaticPool
 
 from app.main import app
-from app.core.database import Base, get_db
+from app.api import deps
+from app.api.routes import products
+from app.core.database import Base, get_async_db, get_db
 from app.core.config import settings
 from app.models.user import User
-from app.core.security import get_password_hash
+from app.core.security import create_access_token, get_password_hash
+
+# Create test database; async endpoints reach the same file through aiosqlite
+TEST_DATABASE_URL = f"sqlite:///{_TEST_DB_PATH}"
+TEST_ASYNC_DATABASE_URL = f"sqlite+aiosqlite:///{_TEST_DB_PATH}"
 
-# Create test database
-TEST_DATABASE_URL = "sqlite:///./test.db"
+def _sqlite_date_trunc(field, value):
+    """PostgreSQL's date_trunc for the day/week/month buckets analytics uses"""
+    if value is None:
+        return None
+    moment = datetime.fromisoformat(value)
+    if field == "month":
+        moment = moment.replace(day=1)
+    elif field == "week":
+        moment -= timedelta(days=moment.weekday())
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0).isoformat()
 
 @pytest.fixture(scope="session")
 def test_engine():
@@ -23,6 +55,21 @@ def test_engine():
     Base.metadata.create_all(bind=engine)
     yield engine
     Base.metadata.drop_all(bind=engine)
+    engine.dispose()
+    shutil.rmtree(_TEST_DB_DIR, ignore_errors=True)
+
+@pytest.fixture(scope="session")
+def test_async_engine(test_engine):
+    # NullPool: each TestClient runs its own event loop, and an aiosqlite
+    # connection can't be carried over from one loop to the next
+    engine = create_async_engine(TEST_ASYNC_DATABASE_URL, poolclass=NullPool)
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def _register_functions(dbapi_connection, _connection_record):
+        dbapi_connection.create_function("date_trunc", 2, _sqlite_date_trunc)
+
+    yield engine
+    engine.sync_engine.dispose()
 
 @pytest.fixture(scope="function")
 def test_db(test_engine):
@@ -39,14 +86,29 @@ def test_db(test_engine):
             conn.commit()  # Single commit after all deletes
 
 @pytest.fixture(scope="function")
-def client(test_db):
+def client(test_db, test_async_engine):
     def override_get_db():
         try:
             yield test_db
         finally:
             pass
-    
+
+    TestingAsyncSessionLocal = async_sessionmaker(
+        test_async_engine, autoflush=False, expire_on_commit=False
+    )
+
+    async def override_get_async_db():
+        async with TestingAsyncSessionLocal() as db:
+            yield db
+
+    # Row IDs are reused once tables are emptied, so auth results and products
+    # cached by an earlier test must not leak into this one
+    deps._token_cache.clear()
+    deps._user_cache.clear()
+    products._product_cache.clear()
+
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
     with TestClient(app) as c:
         yield c
     app.dependency_overrides.clear()
@@ -65,3 +127,26 @@ def test_user(test_db):
     test_db.commit()
     test_db.refresh(user)
     return user
+
+@pytest.fixture(scope="function")
+def test_admin(test_db):
+    admin = User(
+        email="admin@example.com",
+        username="adminuser",
+        hashed_password=get_password_hash("adminpassword"),
+        full_name="Admin User",
+        is_active=True,
+        is_admin=True
+    )
+    test_db.add(admin)
+    test_db.commit()
+    test_db.refresh(admin)
+    return admin
+
+@pytest.fixture(scope="function")
+def user_headers(test_user):
+    return {"Authorization": f"Bearer {create_access_token(test_user.id)}"}
+
+@pytest.fixture(scope="function")
+def admin_headers(test_admin):
+    return {"Authorization": f"Bearer {create_access_token(test_admin.id)}"}
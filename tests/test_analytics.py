@@ -0,0 +1,62 @@
+from datetime import datetime, timedelta
+
+from app.models.order import Order, OrderItem, OrderStatus
+from app.models.product import Product
+
+
+def _add_orders(db, user):
+    laptop = Product(name="Laptop", price=100.0, stock=3, sku="TECH-001")
+    mug = Product(name="Mug", price=10.0, stock=7, sku="HOME-001")
+    db.add_all([laptop, mug])
+    db.flush()
+    paid = Order(user_id=user.id, total_amount=100.0, shipping_address="1 Main St",
+                 status=OrderStatus.PAID)
+    processing = Order(user_id=user.id, total_amount=30.0, shipping_address="1 Main St",
+                       status=OrderStatus.PROCESSING)
+    pending = Order(user_id=user.id, total_amount=500.0, shipping_address="1 Main St")
+    db.add_all([paid, processing, pending])
+    db.flush()
+    db.add_all([
+        OrderItem(order_id=paid.id, product_id=laptop.id, product_name="Laptop",
+                  quantity=1, unit_price=100.0),
+        OrderItem(order_id=processing.id, product_id=mug.id, product_name="Mug",
+                  quantity=3, unit_price=10.0),
+        OrderItem(order_id=pending.id, product_id=laptop.id, product_name="Laptop",
+                  quantity=5, unit_price=100.0),
+    ])
+    db.commit()
+
+
+def _date_range():
+    now = datetime.now()
+    return {"start_date": (now - timedelta(days=2)).isoformat(),
+            "end_date": (now + timedelta(days=2)).isoformat()}
+
+
+def test_sales_analytics_counts_paid_and_processing_orders(client, test_db, test_admin, admin_headers):
+    _add_orders(test_db, test_admin)
+
+    response = client.get("/api/analytics/sales", params=_date_range(), headers=admin_headers)
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["summary"] == {"total_orders": 2, "total_revenue": 130.0, "average_order_value": 65.0}
+    assert sum(row["order_count"] for row in body["data"]) == 2
+
+
+def test_top_products_ranks_by_revenue(client, test_db, test_admin, admin_headers):
+    _add_orders(test_db, test_admin)
+
+    response = client.get("/api/analytics/top-products", headers=admin_headers)
+
+    assert response.status_code == 200
+    assert [(p["product_name"], p["units_sold"], p["revenue"]) for p in response.json()] == [
+        ("Laptop", 1, 100.0),
+        ("Mug", 3, 30.0),
+    ]
+
+
+def test_analytics_requires_admin(client, user_headers):
+    response = client.get("/api/analytics/sales", headers=user_headers)
+
+    assert response.status_code == 403
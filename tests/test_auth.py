@@ -0,0 +1,32 @@
+from app.api.routes import auth
+
+
+def test_login_returns_token(client, test_user):
+    response = client.post(
+        "/api/auth/login",
+        data={"username": "TEST@example.com", "password": "testpassword"},
+    )
+
+    assert response.status_code == 200
+    assert response.json()["token_type"] == "bearer"
+
+
+def test_repeat_unknown_email_still_pays_for_bcrypt(client, test_db, monkeypatch):
+    auth._unknown_login_cache.clear()
+    verified = []
+    original = auth.averify_password
+
+    async def counting_verify(plain_password, hashed_password):
+        verified.append(hashed_password)
+        return await original(plain_password, hashed_password)
+
+    monkeypatch.setattr(auth, "averify_password", counting_verify)
+    form = {"username": "nobody@example.com", "password": "whatever"}
+
+    first = client.post("/api/auth/login", data=form)
+    second = client.post("/api/auth/login", data=form)
+
+    assert first.status_code == second.status_code == 401
+    # The second attempt is served from the negative cache but is still verified
+    assert len(verified) == 2
+    assert verified[0] == verified[1] == auth._dummy_password_hash
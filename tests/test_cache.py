@@ -0,0 +1,80 @@
+import asyncio
+from decimal import Decimal
+
+import fakeredis
+import pytest
+
+from app.core import cache
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    client = fakeredis.FakeAsyncRedis()
+    monkeypatch.setattr(cache, "redis_client", client)
+    return client
+
+
+def _counting_endpoint(calls):
+    async def list_things(category=None, db=None, current_user=None):
+        calls.append(category)
+        return [{"category": category, "price": Decimal("9.99")}]
+    return list_things
+
+
+def test_cache_response_miss_then_hit(redis):
+    calls = []
+    endpoint = cache.cache_response(prefix="things", expire_seconds=60)(_counting_endpoint(calls))
+
+    async def scenario():
+        first = await endpoint(category="a", db=object())
+        # A different session object must not change the key
+        second = await endpoint(category="a", db=object())
+        other = await endpoint(category="b", db=object())
+        return first, second, other, await redis.smembers("things:tags")
+
+    first, second, other, tagged = asyncio.run(scenario())
+
+    assert calls == ["a", "b"]
+    assert first == [{"category": "a", "price": Decimal("9.99")}]
+    assert second == [{"category": "a", "price": 9.99}]
+    assert other[0]["category"] == "b"
+    assert len(tagged) == 2
+    assert all(key.startswith(b"things:list_things:") for key in tagged)
+
+
+def test_invalidate_cache_tag_evicts_tagged_entries(redis):
+    calls = []
+    endpoint = cache.cache_response(prefix="things", expire_seconds=60)(_counting_endpoint(calls))
+
+    async def scenario():
+        await redis.set("other:key", b"1")
+        await endpoint(category="a")
+        await cache.invalidate_cache_tag("things")
+        remaining = sorted(await redis.keys("*"))
+        await endpoint(category="a")
+        return remaining
+
+    remaining = asyncio.run(scenario())
+
+    assert remaining == [b"other:key"]
+    assert calls == ["a", "a"]
+
+
+def test_invalidate_cache_unlinks_matches_in_batches(redis, monkeypatch):
+    monkeypatch.setattr(cache, "_INVALIDATE_BATCH_SIZE", 2)
+
+    async def scenario():
+        for i in range(5):
+            await redis.set(f"things:{i}", b"1")
+        await redis.set("other:key", b"1")
+        await cache.invalidate_cache("things:*")
+        return await redis.keys("*")
+
+    assert asyncio.run(scenario()) == [b"other:key"]
+
+
+def test_cache_response_is_a_no_op_without_redis(monkeypatch):
+    monkeypatch.setattr(cache, "redis_client", None)
+    endpoint = _counting_endpoint([])
+
+    assert cache.cache_response(prefix="things")(endpoint) is endpoint
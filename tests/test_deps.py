@@ -0,0 +1,43 @@
+from app.api.deps import invalidate_user_cache
+from app.models.user import User
+
+
+def test_cached_user_is_honored_until_invalidated(client, test_db, test_user, user_headers):
+    assert client.get("/api/orders/", headers=user_headers).status_code == 200
+
+    # Changed behind the API's back, so nothing invalidates the cache
+    test_db.query(User).filter(User.id == test_user.id).update({"is_active": False})
+    test_db.commit()
+    cached = client.get("/api/orders/", headers=user_headers)
+    invalidate_user_cache(test_user.id)
+    reloaded = client.get("/api/orders/", headers=user_headers)
+
+    assert cached.status_code == 200
+    assert reloaded.status_code == 403
+    assert reloaded.json()["detail"] == "Inactive user"
+
+
+def test_admin_deactivation_applies_immediately(client, test_user, user_headers, admin_headers):
+    assert client.get("/api/orders/", headers=user_headers).status_code == 200
+
+    response = client.put(f"/api/admin/users/{test_user.id}", json={"is_active": False},
+                          headers=admin_headers)
+
+    assert response.status_code == 200
+    assert response.json()["is_active"] is False
+    assert client.get("/api/orders/", headers=user_headers).status_code == 403
+
+
+def test_admin_promotion_applies_immediately(client, test_user, user_headers, admin_headers):
+    assert client.get("/api/admin/orders", headers=user_headers).status_code == 403
+
+    client.put(f"/api/admin/users/{test_user.id}", json={"is_admin": True}, headers=admin_headers)
+
+    assert client.get("/api/admin/orders", headers=user_headers).status_code == 200
+
+
+def test_only_admins_can_change_user_status(client, test_user, user_headers):
+    response = client.put(f"/api/admin/users/{test_user.id}", json={"is_admin": True},
+                          headers=user_headers)
+
+    assert response.status_code == 403
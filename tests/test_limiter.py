@@ -0,0 +1,41 @@
+import os
+
+import fakeredis
+import pytest
+
+from app.core.limiter import BatchedRedisStorage
+
+
+@pytest.fixture
+def storage():
+    storage = BatchedRedisStorage("batched+redis://localhost:6379/0")
+    storage.storage = fakeredis.FakeRedis()
+    storage.initialize_storage("redis://localhost:6379/0")
+    # Flushes are driven by the tests
+    storage._start_flusher = lambda: None
+    return storage
+
+
+def test_batched_hits_reach_the_shared_counter(storage):
+    for _ in range(5):
+        storage.incr("k", 60)
+
+    storage._flush()
+
+    assert storage.get("k") == 5
+    assert storage.storage.keys() == [b"LIMITS:k"]
+    assert int(storage.storage.get("LIMITS:k")) == 5
+
+
+def test_forked_process_starts_with_empty_counters(storage):
+    storage.incr("k", 60)
+    storage.incr("k", 60)
+    storage._flusher = object()
+
+    # Pretend this instance was inherited across a fork
+    storage._pid = os.getpid() + 1
+    storage.incr("k", 60)
+
+    assert storage._flusher is None
+    assert storage._pending == {}
+    assert storage.get("k") == 2
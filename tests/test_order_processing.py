@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.models.order import Order, OrderItem, OrderStatus
+from app.models.product import Product
+from app.services import orders as order_service
+
+
+@pytest.fixture
+def process(test_async_engine, monkeypatch):
+    # The job opens its own session, so point it at the test database
+    monkeypatch.setattr(
+        order_service, "AsyncSessionLocal",
+        async_sessionmaker(test_async_engine, expire_on_commit=False),
+    )
+    return lambda order_id: asyncio.run(order_service.process_order_after_payment(order_id))
+
+
+def _paid_order(db, user, lines):
+    order = Order(user_id=user.id, total_amount=0, shipping_address="1 Main St",
+                  status=OrderStatus.PAID)
+    db.add(order)
+    db.flush()
+    for product, quantity in lines:
+        db.add(OrderItem(order_id=order.id, product_id=product.id, product_name=product.name,
+                         quantity=quantity, unit_price=product.price))
+    db.commit()
+    return order
+
+
+def _products(db):
+    mug = Product(name="Mug", price=10.0, stock=5, sku="HOME-001")
+    pen = Product(name="Pen", price=5.0, stock=1, sku="HOME-002")
+    db.add_all([mug, pen])
+    db.commit()
+    return mug, pen
+
+
+def test_stock_is_decremented_and_order_claimed(process, test_db, test_user):
+    mug, pen = _products(test_db)
+    order = _paid_order(test_db, test_user, [(mug, 2), (pen, 1), (mug, 1)])
+
+    process(order.id)
+
+    test_db.expire_all()
+    assert (mug.stock, mug.version_id) == (2, 2)
+    assert (pen.stock, pen.version_id) == (0, 2)
+    assert order.status == OrderStatus.PROCESSING
+
+
+def test_short_stock_fails_order_without_decrementing(process, test_db, test_user):
+    mug, pen = _products(test_db)
+    order = _paid_order(test_db, test_user, [(mug, 2), (pen, 2)])
+
+    process(order.id)
+
+    test_db.expire_all()
+    assert (mug.stock, mug.version_id) == (5, 1)
+    assert (pen.stock, pen.version_id) == (1, 1)
+    assert order.status == OrderStatus.FAILED
+
+
+def test_second_run_is_a_no_op(process, test_db, test_user):
+    mug, pen = _products(test_db)
+    order = _paid_order(test_db, test_user, [(mug, 2)])
+
+    process(order.id)
+    process(order.id)
+
+    test_db.expire_all()
+    assert (mug.stock, mug.version_id) == (3, 2)
+    assert order.status == OrderStatus.PROCESSING
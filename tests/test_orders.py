@@ -0,0 +1,29 @@
+from app.models.order import Order, OrderItem, OrderStatus
+from app.models.product import Product
+from app.models.user import User
+
+
+def test_get_user_orders_returns_own_orders_with_items(client, test_db, test_user, user_headers):
+    other = User(email="other@example.com", username="other", hashed_password="x")
+    mug = Product(name="Mug", price=10.0, stock=5, sku="HOME-001")
+    pen = Product(name="Pen", price=5.0, stock=5, sku="HOME-002")
+    test_db.add_all([other, mug, pen])
+    test_db.flush()
+    own = Order(user_id=test_user.id, total_amount=20.0, shipping_address="1 Main St",
+                status=OrderStatus.PAID)
+    foreign = Order(user_id=other.id, total_amount=5.0, shipping_address="2 Side St")
+    test_db.add_all([own, foreign])
+    test_db.flush()
+    test_db.add_all([
+        OrderItem(order_id=own.id, product_id=mug.id, product_name="Mug", quantity=2, unit_price=10.0),
+        OrderItem(order_id=foreign.id, product_id=pen.id, product_name="Pen", quantity=1, unit_price=5.0),
+    ])
+    test_db.commit()
+
+    response = client.get("/api/orders/", headers=user_headers)
+
+    assert response.status_code == 200
+    orders = response.json()
+    assert [o["id"] for o in orders] == [own.id]
+    assert orders[0]["status"] == "paid"
+    assert [(i["product_name"], i["quantity"]) for i in orders[0]["items"]] == [("Mug", 2)]
@@ -0,0 +1,111 @@
+import asyncio
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.api.routes import orders as order_routes
+from app.models.cart import Cart, CartItem
+from app.models.outbox import Outbox
+from app.models.product import Product
+from app.services import outbox as outbox_service
+
+
+class FakeEmailService:
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.sent = []
+
+    async def send_order_confirmation(self, to_email, order_details):
+        if to_email in self.failing:
+            raise ConnectionError("SMTP down")
+        self.sent.append(order_details["id"])
+        return True
+
+
+@pytest.fixture
+def dispatch(test_async_engine, monkeypatch):
+    # The dispatcher opens its own sessions, so point it at the test database
+    monkeypatch.setattr(
+        outbox_service, "AsyncSessionLocal",
+        async_sessionmaker(test_async_engine, expire_on_commit=False),
+    )
+
+    def run(email_service, batch_size=10):
+        monkeypatch.setattr(outbox_service, "get_email_service", lambda: email_service)
+        return asyncio.run(outbox_service.dispatch_order_confirmations(batch_size=batch_size))
+    return run
+
+
+def _queue(db, *emails, attempts=0):
+    rows = [
+        Outbox(kind=outbox_service.ORDER_CONFIRMATION, attempts=attempts,
+               payload={"to_email": email, "order": {"id": i, "items": []}})
+        for i, email in enumerate(emails, start=1)
+    ]
+    db.add_all(rows)
+    db.commit()
+    return rows
+
+
+def test_sends_whole_backlog_in_batches(dispatch, test_db):
+    _queue(test_db, *(f"user{i}@example.com" for i in range(5)))
+    email = FakeEmailService()
+
+    sent = dispatch(email, batch_size=2)
+
+    assert sent == 5
+    assert email.sent == [1, 2, 3, 4, 5]
+    assert test_db.query(Outbox).count() == 0
+
+
+def test_failed_send_is_kept_with_its_error(dispatch, test_db):
+    _queue(test_db, "ok@example.com", "bad@example.com")
+
+    sent = dispatch(FakeEmailService(failing={"bad@example.com"}))
+
+    assert sent == 1
+    row = test_db.query(Outbox).one()
+    assert row.payload["to_email"] == "bad@example.com"
+    assert row.attempts == 1
+    assert "SMTP down" in row.last_error
+
+
+def test_row_is_parked_at_max_attempts(dispatch, test_db):
+    _queue(test_db, "bad@example.com", attempts=outbox_service.MAX_ATTEMPTS - 1)
+
+    dispatch(FakeEmailService(failing={"bad@example.com"}))
+    test_db.expire_all()
+    email = FakeEmailService()
+    sent = dispatch(email)
+
+    row = test_db.query(Outbox).one()
+    assert row.attempts == outbox_service.MAX_ATTEMPTS
+    # Parked rows are no longer picked up, even once sending would succeed
+    assert (sent, email.sent) == (0, [])
+
+
+def test_order_drains_outbox_in_process_without_a_queue(client, test_db, test_user,
+                                                       user_headers, monkeypatch):
+    product = Product(name="Mug", price=10.0, stock=5, sku="HOME-001")
+    cart = Cart(user_id=test_user.id)
+    test_db.add_all([product, cart])
+    test_db.flush()
+    test_db.add(CartItem(cart_id=cart.id, product_id=product.id, quantity=1, unit_price=10.0))
+    test_db.commit()
+    dispatched = []
+
+    async def record_dispatch():
+        dispatched.append(test_db.query(Outbox).count())
+
+    async def skip_stock_update(background_tasks, order_id):
+        pass
+
+    monkeypatch.setattr(order_routes, "dispatch_order_confirmations", record_dispatch)
+    monkeypatch.setattr(order_routes, "_queue_stock_update", skip_stock_update)
+
+    response = client.post("/api/orders/", json={"shipping_address": "1 Main St"},
+                           headers=user_headers)
+
+    assert response.status_code == 200
+    # Ran after the commit, with the confirmation row in place
+    assert dispatched == [1]
@@ -0,0 +1,49 @@
+from app.models.product import Product
+
+
+def _add_products(db):
+    db.add_all([
+        Product(name="Laptop", description="Fast laptop", price=999.99, stock=5,
+                category="Electronics", sku="TECH-001"),
+        Product(name="Headphones", description="Noise cancelling", price=149.99, stock=10,
+                category="Audio", sku="AUDIO-001"),
+        Product(name="Old Phone", description="Discontinued", price=99.99, stock=0,
+                category="Electronics", sku="TECH-000", is_active=False),
+    ])
+    db.commit()
+
+
+def test_list_products_returns_only_active(client, test_db):
+    _add_products(test_db)
+
+    response = client.get("/api/products/")
+
+    assert response.status_code == 200
+    assert sorted(p["sku"] for p in response.json()) == ["AUDIO-001", "TECH-001"]
+
+
+def test_list_products_filters(client, test_db):
+    _add_products(test_db)
+
+    by_category = client.get("/api/products/", params={"category": "Electronics"})
+    by_price = client.get("/api/products/", params={"min_price": 100, "max_price": 500})
+    by_search = client.get("/api/products/", params={"search": "noise"})
+
+    assert [p["sku"] for p in by_category.json()] == ["TECH-001"]
+    assert [p["sku"] for p in by_price.json()] == ["AUDIO-001"]
+    assert [p["sku"] for p in by_search.json()] == ["AUDIO-001"]
+
+
+def test_update_and_delete_evict_cached_product(client, test_db, admin_headers):
+    _add_products(test_db)
+    laptop = test_db.query(Product).filter(Product.sku == "TECH-001").one()
+    url = f"/api/products/{laptop.id}"
+
+    assert client.get(url).json()["stock"] == 5
+    client.put(url, json={"stock": 2}, headers=admin_headers)
+    updated = client.get(url)
+    client.delete(url, headers=admin_headers)
+    deleted = client.get(url)
+
+    assert updated.json()["stock"] == 2
+    assert deleted.status_code == 404
@@ -0,0 +1,134 @@
+import hashlib
+import hmac
+import time
+
+import orjson
+import pytest
+from sqlalchemy import update
+from sqlalchemy.orm.exc import StaleDataError
+
+from app.api.routes import orders as order_routes
+from app.core.config import settings
+from app.models.order import Order, OrderStatus
+from app.models.stripe_event import StripeEvent
+
+WEBHOOK_URL = "/api/orders/webhook/stripe"
+WEBHOOK_SECRET = "whsec_test"
+
+
+@pytest.fixture
+def queued(monkeypatch):
+    monkeypatch.setattr(settings, "STRIPE_WEBHOOK_SECRET", WEBHOOK_SECRET)
+    queued = []
+
+    async def record_stock_update(background_tasks, order_id):
+        queued.append(order_id)
+
+    monkeypatch.setattr(order_routes, "_queue_stock_update", record_stock_update)
+    return queued
+
+
+def _signed(payload: bytes, secret: str = WEBHOOK_SECRET) -> dict:
+    timestamp = int(time.time())
+    signature = hmac.new(
+        secret.encode(), f"{timestamp}.".encode() + payload, hashlib.sha256
+    ).hexdigest()
+    return {
+        "Content-Type": "application/json",
+        "Stripe-Signature": f"t={timestamp},v1={signature}",
+    }
+
+
+def _succeeded(event_id: str, order_id: int) -> bytes:
+    return orjson.dumps({
+        "id": event_id,
+        "type": "payment_intent.succeeded",
+        "data": {"object": {"id": "pi_123", "metadata": {"order_id": str(order_id)}}},
+    })
+
+
+def _pending_order(db, user):
+    order = Order(user_id=user.id, total_amount=10.0, shipping_address="1 Main St")
+    db.add(order)
+    db.commit()
+    return order
+
+
+def test_rejects_wrong_content_type(client, queued):
+    response = client.post(WEBHOOK_URL, content=b"{}", headers={"Content-Type": "text/plain"})
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid content type"
+
+
+def test_rejects_missing_content_length(client, queued):
+    # A generator body is sent chunked, without a Content-Length
+    response = client.post(
+        WEBHOOK_URL, content=iter([b"{}"]), headers={"Content-Type": "application/json"}
+    )
+
+    assert response.status_code == 411
+
+
+@pytest.mark.parametrize("length, detail", [
+    ("0", "Empty payload"),
+    ("abc", "Invalid Content-Length"),
+    (str(order_routes._WEBHOOK_MAX_BYTES + 1), "Payload too large"),
+])
+def test_rejects_bad_content_length(client, queued, length, detail):
+    response = client.post(
+        WEBHOOK_URL, content=b"",
+        headers={"Content-Type": "application/json", "Content-Length": length},
+    )
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == detail
+
+
+def test_rejects_bad_signature(client, test_db, queued):
+    payload = _succeeded("evt_1", 1)
+
+    response = client.post(WEBHOOK_URL, content=payload, headers=_signed(payload, "whsec_other"))
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid signature"
+    assert test_db.query(StripeEvent).count() == 0
+
+
+def test_payment_succeeded_marks_order_paid_once(client, test_db, test_user, queued):
+    order = _pending_order(test_db, test_user)
+    payload = _succeeded("evt_1", order.id)
+
+    first = client.post(WEBHOOK_URL, content=payload, headers=_signed(payload))
+    duplicate = client.post(WEBHOOK_URL, content=payload, headers=_signed(payload))
+
+    assert first.json() == {"status": "success"}
+    assert duplicate.json() == {"status": "already processed"}
+    test_db.refresh(order)
+    assert (order.status, order.payment_id) == (OrderStatus.PAID, "pi_123")
+    assert queued == [order.id]
+    assert test_db.query(StripeEvent).count() == 1
+
+
+def test_concurrent_delivery_is_not_processed_twice(client, test_db, test_user, queued, monkeypatch):
+    order = _pending_order(test_db, test_user)
+    real_commit = test_db.commit
+
+    def commit_after_other_delivery():
+        # Another delivery marks the order paid between our read and our commit
+        monkeypatch.setattr(test_db, "commit", real_commit)
+        test_db.rollback()
+        test_db.execute(
+            update(Order).where(Order.id == order.id)
+            .values(status=OrderStatus.PAID, version_id=Order.version_id + 1)
+        )
+        real_commit()
+        raise StaleDataError("version_id mismatch")
+
+    monkeypatch.setattr(test_db, "commit", commit_after_other_delivery)
+    payload = _succeeded("evt_2", order.id)
+
+    response = client.post(WEBHOOK_URL, content=payload, headers=_signed(payload))
+
+    assert response.json() == {"status": "already processed"}
+    assert queued == []
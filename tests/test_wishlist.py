@@ -0,0 +1,25 @@
+from app.models.product import Product
+from app.models.wishlist import WishlistItem
+
+
+def test_get_wishlist_lists_active_products(client, test_db, test_user, user_headers):
+    active = Product(name="Laptop", price=999.99, stock=5, sku="TECH-001")
+    inactive = Product(name="Old Phone", price=99.99, stock=0, sku="TECH-000", is_active=False)
+    test_db.add_all([active, inactive])
+    test_db.flush()
+    test_db.add_all([
+        WishlistItem(user_id=test_user.id, product_id=active.id),
+        WishlistItem(user_id=test_user.id, product_id=inactive.id),
+    ])
+    test_db.commit()
+
+    response = client.get("/api/wishlist/", headers=user_headers)
+
+    assert response.status_code == 200
+    assert [p["sku"] for p in response.json()] == ["TECH-001"]
+
+
+def test_get_wishlist_requires_auth(client):
+    response = client.get("/api/wishlist/")
+
+    assert response.status_code == 401